@@ -0,0 +1,532 @@
+#!/usr/bin/env python
+
+"""Micro-benchmarks for pygameui.
+
+    pygameui-benchmark.py [benchmark ...]
+
+Runs every benchmark when none are named. Rendering runs headless
+(SDL's dummy video driver) unless SDL_VIDEODRIVER is already set.
+
+"""
+
+import gc
+import logging
+import os
+import random
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygameui as ui
+from pygameui import atlas
+
+
+WIDGET_SIZES = [
+    ('label', (180, 28)),
+    ('button', (100, 28)),
+    ('panel', (200, 250)),
+    ('window', (640, 480)),
+    ('full hd', (1920, 1080)),
+]
+
+
+def time_per_call(fn, number=20, repeat=3):
+    """Best time of `repeat` runs in milliseconds per call."""
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1000
+
+
+def iter_views(root):
+    yield root
+    for child in root.children:
+        for view in iter_views(child):
+            yield view
+
+
+def kitchensink_scene():
+    """The scene of the kitchen sink demo, styled but not pushed."""
+    path = os.path.join(os.path.dirname(__file__), 'pygameui-kitchensink.py')
+    scene_class = runpy.run_path(path)['KitchenSinkScene']
+    logging.getLogger().setLevel(logging.WARNING)   # the demo logs DEBUG
+    scene = scene_class()
+    scene.stylize()
+    return scene
+
+
+def label_list(count=500):
+    """A list view of `count` labels, styled."""
+    labels = [ui.Label(ui.Rect(0, 0, 180, ui.theme.current.label_height),
+                       'Item %d' % (i + 1), halign=ui.LEFT)
+              for i in range(count)]
+    list_view = ui.ListView(ui.Rect(0, 0, 180, 0), labels)
+    list_view.stylize()
+    return list_view
+
+
+def bench_gradients():
+    """Render gradients with and without NumPy at common sizes."""
+    colors = ((255, 255, 255), (192, 192, 192))
+    accelerated = ui.render.accelerated
+    if ui.render.numpy is None:
+        print('NumPy is not installed; only the fallback path is timed.')
+
+    print('%-10s %-12s %-10s %12s %12s %8s' % (
+        'size', 'dimensions', 'direction', 'lines ms', 'numpy ms', 'speedup'))
+
+    try:
+        for name, size in WIDGET_SIZES:
+            for vertical in (True, False):
+                def render():
+                    ui.render.render_gradient(size, colors[0], colors[1],
+                                              vertical)
+
+                ui.render.accelerated = False
+                lines_ms = time_per_call(render)
+                numpy_ms = speedup = float('nan')
+                if ui.render.numpy is not None:
+                    ui.render.accelerated = True
+                    numpy_ms = time_per_call(render)
+                    speedup = lines_ms / numpy_ms
+
+                print('%-10s %-12s %-10s %12.3f %12.3f %7.1fx' % (
+                    name, '%dx%d' % size,
+                    'vertical' if vertical else 'horizontal',
+                    lines_ms, numpy_ms, speedup))
+    finally:
+        ui.render.accelerated = accelerated
+
+
+def bench_text_shadows():
+    """Re-render all label text, shadows by font vs. by tinting."""
+    tint_text_shadows = ui.render.tint_text_shadows
+
+    print('%-22s %8s %12s %12s %8s' % (
+        'scene', 'labels', 'font ms', 'tint ms', 'speedup'))
+
+    try:
+        for name, root in (('kitchen sink', kitchensink_scene()),
+                           ('500-label list', label_list(500))):
+            labels = [view for view in iter_views(root)
+                      if isinstance(view, ui.Label)]
+
+            def render():
+                # Start cold each time so every line is rasterized.
+                ui.render.text_cache.clear()
+                for label in labels:
+                    label.render()
+
+            ui.render.tint_text_shadows = False
+            font_ms = time_per_call(render, number=5)
+            ui.render.tint_text_shadows = True
+            tint_ms = time_per_call(render, number=5)
+
+            print('%-22s %8d %12.3f %12.3f %7.2fx' % (
+                name, len(labels), font_ms, tint_ms, font_ms / tint_ms))
+    finally:
+        ui.render.tint_text_shadows = tint_text_shadows
+
+
+def bench_measure():
+    """Measure 2000 distinct words with font.size vs. measure_many."""
+    font = ui.resource.get_font(16)
+    words = ['%s%d' % (word, i) for i, word in enumerate(
+        'lorem ipsum dolor sit amet consectetur adipiscing elit'.split() * 250)]
+    metrics = ui.resource.get_font_metrics(font)
+
+    def sdl():
+        for word in words:
+            font.size(word)
+
+    def cold():
+        metrics.measured.clear()
+        ui.resource.measure_many(font, words)
+
+    def warm():
+        ui.resource.measure_many(font, words)
+
+    print('%-24s %12s' % ('method', 'ms'))
+    for name, fn in (('font.size', sdl),
+                     ('measure_many (new)', cold),
+                     ('measure_many (seen)', warm)):
+        print('%-24s %12.3f' % (name, time_per_call(fn)))
+
+
+def bench_readout():
+    """A numeric readout updated every frame, rendered vs. glyph atlas."""
+    scene = ui.Scene()
+    readout = ui.Label(ui.Rect(10, 10, 200, ui.theme.current.label_height),
+                       '0.00')
+    scene.add_child(readout)
+    scene.stylize()
+
+    print('%-12s %10s %16s' % ('mode', 'ms/frame', 'text renders'))
+    for name, glyph_atlas in (('rendered', False), ('glyph atlas', True)):
+        readout.glyph_atlas = glyph_atlas
+        readout.layout()
+        frames = iter(range(10 ** 9))
+        renders = ui.render.text_cache.misses
+
+        def frame():
+            readout.text = '%.2f' % (next(frames) / 60.0)
+            scene.draw()
+
+        frame_ms = time_per_call(frame, number=600)
+        renders = ui.render.text_cache.misses - renders
+        print('%-12s %10.3f %16d' % (name, frame_ms, renders))
+
+
+def make_photos(directory, count, size=(1024, 768)):
+    """Write `count` copies of a noisy image to directory/images."""
+    os.mkdir(os.path.join(directory, 'images'))
+    photo = ui.pygame.Surface(size)
+    rng = random.Random(0)
+    for _ in range(400):
+        color = [rng.randrange(256) for _ in range(3)]
+        ui.pygame.draw.circle(photo, color, (rng.randrange(size[0]),
+                                             rng.randrange(size[1])),
+                              rng.randrange(10, 120))
+    first = os.path.join(directory, 'images', 'photo0.png')
+    ui.pygame.image.save(photo, first)
+    for i in range(1, count):
+        shutil.copy(first, os.path.join(directory, 'images',
+                                        'photo%d.png' % i))
+    return ['photo%d' % i for i in range(count)]
+
+
+def bench_gallery():
+    """Open a scene of 200 thumbnails of 1024x768 photos."""
+    directory = tempfile.mkdtemp()
+    ui.resource.add_search_path(directory)
+    thumb = (96, 72)
+    try:
+        names = make_photos(directory, 200)
+
+        def open_gallery(image_for_name):
+            scene = ui.Scene()
+            for i, name in enumerate(names):
+                frame = ui.Rect((i % 10) * 100, (i // 10) * 76, thumb[0],
+                                thumb[1])
+                scene.add_child(ui.ImageView(frame, image_for_name(name)))
+            scene.stylize()
+            return scene
+
+        print('%-8s %12s %14s %14s' % (
+            'loading', 'open ms', 'worst frame ms', 'all loaded ms'))
+
+        ui.resource.asset_cache.clear()
+        start = time.time()
+        scene = open_gallery(lambda name: name)
+        scene.layout_if_needed()
+        scene.draw()
+        open_ms = (time.time() - start) * 1000
+        print('%-8s %12.1f %14.1f %14.1f' % ('sync', open_ms, open_ms,
+                                             open_ms))
+
+        ui.resource.asset_cache.clear()
+        start = time.time()
+        scene = open_gallery(
+            lambda name: ui.resource.load_image_async(name, thumb))
+        open_ms = (time.time() - start) * 1000
+        worst_ms = 0
+        while ui.resource._loading:
+            frame_start = time.time()
+            ui.resource.finish_loading()
+            scene.layout_if_needed()
+            scene.draw()
+            worst_ms = max(worst_ms, (time.time() - frame_start) * 1000)
+            time.sleep(1 / 60.0)
+        loaded_ms = (time.time() - start) * 1000
+        print('%-8s %12.1f %14.1f %14.1f' % ('async', open_ms, worst_ms,
+                                             loaded_ms))
+    finally:
+        ui.resource.search_paths.remove(directory)
+        shutil.rmtree(directory)
+
+
+def make_icons(directory, count, size=(24, 24)):
+    """Write `count` distinct small images to directory/images."""
+    os.mkdir(os.path.join(directory, 'images'))
+    rng = random.Random(0)
+    for i in range(count):
+        icon = ui.pygame.Surface(size, ui.pygame.SRCALPHA, 32)
+        icon.fill((0, 0, 0, 0))
+        color = [rng.randrange(256) for _ in range(3)]
+        ui.pygame.draw.circle(icon, color, (size[0] // 2, size[1] // 2),
+                              min(size) // 2)
+        ui.pygame.image.save(icon, os.path.join(directory, 'images',
+                                                'icon%d.png' % i))
+    return ['icon%d' % i for i in range(count)]
+
+
+def bench_atlas():
+    """Load and redraw 600 distinct icons, separate images vs. an atlas."""
+    directory = tempfile.mkdtemp()
+    ui.resource.add_search_path(directory)
+    try:
+        names = make_icons(directory, 600)
+
+        def icon_grid():
+            scene = ui.Scene()
+            for i, name in enumerate(names):
+                scene.add_child(ui.ImageView(
+                    ui.Rect((i % 30) * 26, (i // 30) * 26, 0, 0), name))
+            scene.stylize()
+            views = list(iter_views(scene))
+
+            def redraw():
+                for view in views:
+                    view.set_needs_display()
+                scene.draw()
+            return redraw
+
+        print('%-10s %10s %10s %12s' % ('images', 'surfaces', 'load ms',
+                                        'redraw ms'))
+        ui.resource.asset_cache.clear()
+        start = time.time()
+        for name in names:
+            ui.resource.get_image(name)
+        load_ms = (time.time() - start) * 1000
+        print('%-10s %10d %10.1f %12.3f' % ('separate', len(names), load_ms,
+                                            time_per_call(icon_grid())))
+
+        start = time.time()
+        path = os.path.join(directory, 'atlas')
+        atlas.build(names).save(path)
+        build_ms = (time.time() - start) * 1000
+        start = time.time()
+        icons = atlas.load(path)
+        icons.convert()
+        load_ms = (time.time() - start) * 1000
+        ui.resource.add_atlas(icons)
+        ui.resource.asset_cache.clear()
+        print('%-10s %10d %10.1f %12.3f' % ('atlas', 1, load_ms,
+                                            time_per_call(icon_grid())))
+        print('atlas sheet %dx%d, built and saved in %.1f ms' % (
+            icons.sheet.get_size() + (build_ms,)))
+        ui.resource.atlases.remove(icons)
+    finally:
+        ui.resource.search_paths.remove(directory)
+        shutil.rmtree(directory)
+
+
+def bench_styles():
+    """Resolve the styles of a 2000-label list, memoized vs. not."""
+    views = list(iter_views(label_list(2000)))
+    theme = ui.theme.current
+
+    def resolve():
+        for view in views:
+            theme.get_dict(view)
+
+    def resolve_unmemoized():
+        for view in views:
+            theme._resolved.clear()
+            theme.get_dict(view)
+
+    print('%-14s %8s %12s' % ('resolution', 'views', 'ms'))
+    for name, fn in (('unmemoized', resolve_unmemoized),
+                     ('memoized', resolve)):
+        print('%-14s %8d %12.3f' % (name, len(views), time_per_call(fn, 5)))
+
+
+def bench_focus():
+    """Focus and blur every button of the kitchen sink scene."""
+    scene = kitchensink_scene()
+    scene.draw()
+    buttons = [view for view in iter_views(scene)
+               if isinstance(view, ui.Button)]
+
+    def toggle():
+        for button in buttons:
+            button.focused()
+            button.blurred()
+
+    stats = ui.view.render_stats = ui.view.RenderStats()
+    toggle()
+    ui.view.render_stats = None
+    layouts = sum(count for (_, kind), count in stats.current.items()
+                  if kind == 'layout')
+    print('%-10s %12s %12s' % ('buttons', 'layouts', 'ms'))
+    print('%-10d %12d %12.3f' % (len(buttons), layouts,
+                                 time_per_call(toggle, 5)))
+
+
+def bench_themes():
+    """Switch between light_theme and dark_theme, stylizing every view
+    and laying it out at once vs. one restyle pass with deferred layouts."""
+    list_scene = ui.Scene()
+    list_scene.add_child(label_list(2000))
+    scenes = (('kitchen sink', kitchensink_scene()),
+              ('2000 labels', list_scene))
+    themes = (ui.theme.light_theme, ui.theme.dark_theme)
+    previous = ui.theme.current
+
+    def stylize_switch():
+        for theme in themes:
+            ui.theme.current = theme
+            ui.render.text_cache.clear()
+            ui.view.current.stylize()
+
+    def use_theme_switch():
+        for theme in themes:
+            ui.theme.use_theme(theme)
+
+    print('%-14s %-10s %12s %12s' % ('scene', 'switch', 'layouts', 'ms'))
+    for scene_name, scene in scenes:
+        ui.view.push(scene)
+        for name, fn in (('stylize', stylize_switch),
+                         ('use_theme', use_theme_switch)):
+            stats = ui.view.render_stats = ui.view.RenderStats()
+            fn()
+            ui.view.render_stats = None
+            layouts = sum(count for (_, kind), count in stats.current.items()
+                          if kind == 'layout')
+            print('%-14s %-10s %12d %12.1f' % (
+                scene_name, name, layouts // len(themes),
+                time_per_call(fn, 3) / len(themes)))
+        ui.view.pop()
+    ui.theme.use_theme(previous)
+
+
+def bench_view_memory(count=10000):
+    """Bytes per view and construction time of plain views and labels."""
+    makers = (
+        ('View', lambda i: ui.View(ui.Rect(0, 0, 24, 24))),
+        ('Label', lambda i: ui.Label(ui.Rect(0, 0, 24, 24), str(i))),
+    )
+    print('%-8s %8s %14s %14s' % ('class', 'views', 'bytes/view', 'us/view'))
+    for name, make in makers:
+        tracemalloc.start()
+        views = [make(i) for i in range(count)]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del views
+        start = time.time()
+        views = [make(i) for i in range(count)]
+        elapsed = time.time() - start
+        del views
+        print('%-8s %8d %14d %14.2f' % (name, count, size // count,
+                                        elapsed / count * 1e6))
+
+
+def bench_signals(count=1000):
+    """Emit signals, collect views connected to a long-lived signal and
+    drag a slider 100 times in a frame."""
+    view = ui.View(ui.Rect(0, 0, 24, 24))
+    signal = ui.Signal()
+    print('%-24s %12s' % ('emission', 'us'))
+    for name, fn in (
+            ('unconnected view signal', lambda: view.on_mouse_up(view)),
+            ('empty Signal', lambda: signal(view))):
+        print('%-24s %12.3f' % (name, time_per_call(fn, 100000) * 1000))
+    strong, weak = ui.Signal(), ui.Signal()
+    strong.connect(view.set_needs_display, weak=False)
+    weak.connect(view.set_needs_display)
+    for name, fn in (('1 strong method slot', strong),
+                     ('1 weak method slot', weak)):
+        print('%-24s %12.3f' % (name, time_per_call(fn, 100000) * 1000))
+
+    scene_signal = ui.Signal()
+    for _ in range(count):
+        orphan = ui.View(ui.Rect(0, 0, 24, 24))
+        scene_signal.connect(orphan.set_needs_display)
+    orphan = None
+    gc.collect()
+    print('%d orphaned views connected; %d slots left after collection' % (
+        count, len(scene_signal.slots)))
+
+    slider = ui.SliderView(ui.Rect(0, 0, 100, 20), ui.HORIZONTAL, 0, 100)
+    calls = []
+    slider.on_value_changed.connect(lambda view, value: calls.append(value))
+    for value in range(1, 101):
+        slider.value = value
+    ui.callback.deliver_queued()
+    print('100 slider values in a frame: %d call(s), last value %s' % (
+        len(calls), calls[-1]))
+
+
+# Run in a fresh interpreter by bench_startup; prints the seconds taken by
+# each step of starting up.
+STARTUP_SCRIPT = """
+import sys
+import time
+sys.path.insert(0, sys.argv[1])
+times = [time.time()]
+import pygame
+times.append(time.time())
+import pygameui as ui
+times.append(time.time())
+ui.init()
+times.append(time.time())
+scene = ui.Scene()
+scene.add_child(ui.Label(ui.Rect(0, 0, 100, ui.theme.current.label_height),
+                         'Hello'))
+scene.add_child(ui.Button(ui.Rect(0, 30, 100, 0), 'OK'))
+scene.stylize()
+scene.draw()
+times.append(time.time())
+print(' '.join(str(b - a) for a, b in zip(times, times[1:])))
+"""
+
+
+def bench_startup(runs=7):
+    """Start fresh processes: import, init() and a first frame."""
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1')
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    samples = []
+    for _ in range(runs):
+        output = subprocess.check_output(
+            [sys.executable, '-c', STARTUP_SCRIPT, root], env=env)
+        samples.append([float(t) * 1000
+                        for t in output.decode().split('\n')[-2].split()])
+
+    print('%-24s %12s' % ('step', 'median ms'))
+    steps = ('import pygame', 'import pygameui', 'pygameui.init()',
+             'first scene and frame')
+    for i, step in enumerate(steps):
+        times = sorted(sample[i] for sample in samples)
+        print('%-24s %12.1f' % (step, times[len(times) // 2]))
+
+
+benchmarks = [
+    ('gradients', bench_gradients),
+    ('text_shadows', bench_text_shadows),
+    ('measure', bench_measure),
+    ('readout', bench_readout),
+    ('gallery', bench_gallery),
+    ('atlas', bench_atlas),
+    ('startup', bench_startup),
+    ('styles', bench_styles),
+    ('focus', bench_focus),
+    ('themes', bench_themes),
+    ('view_memory', bench_view_memory),
+    ('signals', bench_signals),
+]
+
+
+def main(names):
+    ui.init('pygameui benchmark')
+
+    available = dict(benchmarks)
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        sys.exit('unknown benchmark(s): %s; choose from: %s' % (
+            ', '.join(unknown), ', '.join(name for name, _ in benchmarks)))
+
+    for name, fn in benchmarks:
+        if names and name not in names:
+            continue
+        print('== %s: %s' % (name, fn.__doc__))
+        fn()
+        print('')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -205,6 +205,7 @@ class KitchenSinkScene(ui.Scene):
     def update(self, dt):
         ui.Scene.update(self, dt)
         if self.running_task:
+            self.request_update()
             progress = min(1.0, self.progress_view.progress + 0.01)
             self.progress_view.progress = progress
             self.running_task = (self.progress_view.progress < 1.0)
@@ -218,4 +219,4 @@ class KitchenSinkScene(ui.Scene):
 if __name__ == '__main__':
     ui.init('pygameui - Kitchen Sink')
     ui.scene.push(KitchenSinkScene())
-    ui.run()
+    ui.run(idle=True)
@@ -1,38 +1,78 @@
 # coding: utf-8
 
+import importlib
 import logging
+import sys
 
 import pygame
 import copy
 
+from . import callback
 from . import focus
 from . import window
 from . import theme
+from . import resource
 
-from .alert import *
-from .button import *
 from .callback import *
-from .checkbox import *
-from .dialog import *
-from .flipbook import *
-from .grid import *
-from .imagebutton import *
-from .imageview import *
-from .label import *
-from .listview import *
-from .notification import *
-from .progress import *
 from .render import *
 from .resource import *
-from .scroll import *
-from .select import *
-from .slider import *
-from .spinner import *
-from .textfield import *
 from .view import *
 from .scene import Scene
 
 
+# The widget classes, functions and constants, by the module that defines
+# them. Widget modules are imported the first time one of their names is
+# used (see __getattr__), which keeps `import pygameui` fast; Pythons
+# without module __getattr__ (before 3.7) import them all up front.
+_lazy_modules = {
+    'alert': ('AlertView', 'show_alert', 'OK', 'CANCEL'),
+    'button': ('Button',),
+    'checkbox': ('Checkbox',),
+    'dialog': ('DialogView',),
+    'flipbook': ('FlipbookView',),
+    'grid': ('GridView',),
+    'imagebutton': ('ImageButton',),
+    'imageview': ('ImageView', 'view_for_image_named', 'SCALE_TO_FILL'),
+    'label': ('Label', 'LEFT', 'CENTER', 'RIGHT', 'TOP', 'BOTTOM',
+              'WORD_WRAP', 'CLIP'),
+    'listview': ('ListView',),
+    'notification': ('NotificationView', 'show_notification', 'UP', 'DOWN',
+                     'IDLE'),
+    'progress': ('ProgressView',),
+    'scroll': ('ScrollView', 'ScrollbarView', 'ScrollbarThumbView',
+               'SCROLLBAR_SIZE'),
+    'select': ('SelectView',),
+    'slider': ('SliderView', 'SliderTrackView', 'HORIZONTAL', 'VERTICAL'),
+    'spinner': ('SpinnerView',),
+    'textfield': ('TextField',),
+}
+
+_lazy_names = dict((name, module_name)
+                   for module_name, names in _lazy_modules.items()
+                   for name in names)
+
+
+def __getattr__(name):
+    if name in _lazy_modules:
+        return importlib.import_module('.' + name, __name__)
+    module_name = _lazy_names.get(name)
+    if module_name is None:
+        raise AttributeError('module %r has no attribute %r' %
+                             (__name__, name))
+    module = importlib.import_module('.' + module_name, __name__)
+    value = globals()[name] = getattr(module, name)
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_modules) | set(_lazy_names))
+
+
+if sys.version_info < (3, 7):
+    for _name in _lazy_names:
+        __getattr__(_name)
+
+
 """A simple GUI framework for Pygame.
 
 This framework is not meant as a competitor to PyQt or other, perhaps more
@@ -55,6 +95,10 @@ Altering a view's frame requires that you call 'relayout' which will resize the
 view's backing surface and give each child view a chance to reposition and/or
 resize itself in response.
 
+Views keep their backing surfaces between frames and are only redrawn when
+they are invalidated (see View.set_needs_display). Only the parts of the
+window that changed are sent to the display each frame.
+
 Events on views can trigger response code that you control. For instance, when
 a button is clicked, your code can be called back. The click is a "signal" and
 your code is a "slot". The view classes define various signals to which you
@@ -80,9 +124,25 @@ window_surface = None
 default_config = {
     'DISPLAY_SIZE': (640, 480),
     'DISPLAY_MODE': pygame.HWSURFACE | pygame.DOUBLEBUF,
-    'MOUSE_VISIBLE': True
+    'MOUSE_VISIBLE': True,
+    'ALLOWED_EVENTS': [],   # event types to queue besides handled_events
 }
 
+# The event types run() handles; all others are blocked in init() so
+# that they never reach the queue. TEXTINPUT/TEXTEDITING stay allowed
+# since Pygame 2 derives KEYDOWN's unicode from them.
+handled_events = [
+    pygame.QUIT,
+    pygame.MOUSEBUTTONDOWN,
+    pygame.MOUSEBUTTONUP,
+    pygame.MOUSEMOTION,
+    pygame.KEYDOWN,
+    pygame.KEYUP,
+    pygame.VIDEOEXPOSE,
+    resource.IMAGE_LOADED,
+] + [getattr(pygame, name) for name in ('TEXTINPUT', 'TEXTEDITING')
+     if hasattr(pygame, name)]
+
 
 def init(name='', config=None):
     """
@@ -106,18 +166,77 @@ def init(name='', config=None):
     pygame.display.set_caption(name)
     window.rect = pygame.Rect((0, 0), cfg['DISPLAY_SIZE'])
     pygame.mouse.set_visible(cfg['MOUSE_VISIBLE'])
+    pygame.event.set_blocked(None)
+    pygame.event.set_allowed(handled_events + list(cfg['ALLOWED_EVENTS']))
     theme.init()
 
 
-def run():
+def _wait_for_event(timeout):
+    """Block until an event arrives or `timeout` milliseconds pass."""
+    try:
+        return pygame.event.wait(timeout)
+    except TypeError:   # pygame 1.x cannot time out a wait
+        deadline = pygame.time.get_ticks() + timeout
+        while True:
+            e = pygame.event.poll()
+            if e.type != pygame.NOEVENT or pygame.time.get_ticks() >= deadline:
+                return e
+            pygame.time.wait(10)
+
+
+def _coalesce_motion(events):
+    """Merge each run of consecutive MOUSEMOTION events into one event at
+    the last position with the summed relative motion."""
+    merged = []
+    for e in events:
+        if (e.type == pygame.MOUSEMOTION and merged and
+                merged[-1].type == pygame.MOUSEMOTION):
+            rel = merged[-1].rel
+            merged[-1] = pygame.event.Event(
+                pygame.MOUSEMOTION,
+                dict(e.dict, rel=(rel[0] + e.rel[0], rel[1] + e.rel[1])))
+        else:
+            merged.append(e)
+    return merged
+
+
+def run(idle=False, idle_timeout=1000):
+    """Run the main loop; never returns.
+
+    idle
+
+        When True, the loop sleeps until the next event while nothing
+        needs drawing and no view has asked for an update (see
+        View.request_update) instead of ticking 60 times a second.
+        Views that animate in `update` must request updates to keep
+        animating in this mode.
+
+    idle_timeout
+
+        The longest time, in milliseconds, to sleep in idle mode.
+
+    """
     assert len(view.stack) > 0
 
     clock = pygame.time.Clock()
     down_in_view = None
+    drawn_scene = None
 
     elapsed = 0
 
     while True:
+        events = []
+
+        if idle and drawn_scene is view.current and not drawn_scene.dirty:
+            timeout = idle_timeout
+            if view.update_deadline is not None:
+                timeout = min(timeout,
+                              view.update_deadline - pygame.time.get_ticks())
+            if timeout > 0:
+                e = _wait_for_event(timeout)
+                if e.type != pygame.NOEVENT:
+                    events.append(e)
+
         dt = clock.tick(60)
 
         elapsed += dt
@@ -125,15 +244,17 @@ def run():
             elapsed = 0
             logger.debug('%d FPS', clock.get_fps())
 
-        for e in pygame.event.get():
+        events.extend(pygame.event.get())
+
+        # Dispatch one drag/motion per frame rather than one per event.
+        for e in _coalesce_motion(events):
             if e.type == pygame.QUIT:
                 pygame.quit()
                 import sys
                 sys.exit()
 
-            mousepoint = pygame.mouse.get_pos()
-
             if e.type == pygame.MOUSEBUTTONDOWN:
+                mousepoint = e.pos
                 hit_view = view.current.hit(mousepoint)
                 logger.debug('hit %s' % hit_view)
                 if hit_view is not None and not isinstance(hit_view, Scene):
@@ -144,6 +265,7 @@ def run():
                 else:
                     focus.set(None)
             elif e.type == pygame.MOUSEBUTTONUP:
+                mousepoint = e.pos
                 hit_view = view.current.hit(mousepoint)
                 if hit_view is not None:
                     if down_in_view and hit_view != down_in_view:
@@ -153,6 +275,7 @@ def run():
                     hit_view.mouse_up(e.button, pt)
                 down_in_view = None
             elif e.type == pygame.MOUSEMOTION:
+                mousepoint = e.pos
                 if down_in_view and down_in_view.draggable:
                     pt = down_in_view.from_window(mousepoint)
                     down_in_view.mouse_drag(pt, e.rel)
@@ -168,8 +291,57 @@ def run():
                     focus.view.key_up(e.key)
                 else:
                     view.current.key_up(e.key)
+            elif e.type == pygame.VIDEOEXPOSE:
+                drawn_scene = None   # redraw the whole window
+
+        resource.finish_loading()
 
+        view.update_deadline = None
         view.current.update(dt / 1000.0)
-        view.current.draw()
-        window_surface.blit(view.current.surface, (0, 0))
-        pygame.display.flip()
+
+        callback.deliver_queued()
+
+        if view.current is not drawn_scene:
+            drawn_scene = view.current
+            drawn_scene.set_needs_display()
+
+        drawn_scene.layout_if_needed()
+        if drawn_scene.draw():
+            rects = drawn_scene.drawn_rects
+            for rect in rects:
+                window_surface.blit(drawn_scene.surface, rect, rect)
+            pygame.display.update(rects)
+
+        if view.render_stats is not None:
+            view.render_stats.next_frame()
+
+
+# What `from pygameui import *` exports: the public API, the submodules
+# and the lazily imported widget modules and names. Module settings that
+# are rebound at run time (view.current, render.accelerated, ...) are left
+# out; a star import would only copy their value at import time.
+__all__ = [
+    # pygameui
+    'AUTHOR', 'COPYRIGHT', 'LICENSE', 'Rect', 'Scene', 'default_config',
+    'handled_events', 'init', 'logger', 'run',
+    # submodules
+    'cache', 'callback', 'colors', 'focus', 'kvc', 'pygame', 'render',
+    'resource', 'scene', 'spatial', 'theme', 'view', 'window',
+    # callback
+    'LazySignal', 'Signal', 'deliver_queued',
+    # render
+    'GlyphAtlas', 'fill_gradient', 'fillrect', 'get_glyph_atlas',
+    'get_shadow', 'glyph_atlas_cache', 'gradient_cache', 'nine_slice',
+    'render_gradient', 'render_text', 'render_text_shadow', 'shadow_cache',
+    'text_cache', 'tint', 'tint_text_shadows',
+    # resource
+    'FontMetrics', 'IMAGE_LOADED', 'ImageHandle', 'NoSound', 'add_atlas',
+    'add_search_path', 'asset_cache', 'asset_cache_stats', 'asset_stats',
+    'find_asset', 'finish_loading', 'font_metrics', 'get_font',
+    'get_font_metrics', 'get_image', 'get_sound', 'load_image_async',
+    'measure', 'measure_many', 'metrics_chars', 'scale_image',
+    'search_paths',
+    # view
+    'RenderStats', 'View', 'layout_style_keys', 'pop', 'push', 'stack',
+    'surface_pool',
+] + sorted(_lazy_modules) + sorted(_lazy_names)
@@ -52,14 +52,16 @@ class AlertView(dialog.DialogView):
                                         max(self.message_label.margin[1],
                                             self.title_label.margin[1]))
         self.message_label.frame.w = self.frame.w - self.padding[0] * 2
-        self.message_label.render()
         self.message_label.shrink_wrap()
         self.message_label.frame.centerx = self.frame.w // 2
+        self.message_label.layout()
 
         assert self.ok.margin[1] == self.cancel.margin[1]
 
         self.ok.frame.h = theme.current.button_height
         self.cancel.frame.h = theme.current.button_height
+        self.ok.layout()        # buttons size to their captions
+        self.cancel.layout()
 
         btn_top = (self.message_label.frame.bottom +
                    max(self.message_label.margin[1],
@@ -79,9 +81,6 @@ class AlertView(dialog.DialogView):
             self.cancel.hidden = True
             self.ok.frame.centerx = self.frame.w // 2
 
-        self.ok.layout()
-        self.cancel.layout()
-
         self.frame.h = (self.padding[1] +
                         self.title_label.frame.h +
                         max(self.title_label.margin[1],
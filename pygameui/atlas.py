@@ -0,0 +1,183 @@
+"""Texture atlases: many small images packed into one surface.
+
+An atlas keeps small images (icons, sprite sheets) side by side in a
+single sheet surface. The images it hands out are subsurfaces of the
+sheet; blitting one reads the sub-rectangle of the shared sheet instead
+of a surface of its own.
+
+Atlases are built at startup with `build`, or ahead of time and saved
+with `Atlas.save` (or `python -m pygameui.atlas`) to a PNG of the sheet
+plus a JSON index of the rectangles; `load` reads them back. Once added
+to the resource module with `resource.add_atlas` (or with `install`),
+images are looked up in atlases first, so ImageView, ImageButton and
+FlipbookView draw images named in an atlas from its sheet.
+
+"""
+
+import json
+import os
+import sys
+
+import pygame
+
+from . import resource
+
+
+# Images with more pixels than this are not packed by build.
+max_packed_pixels = 128 * 128
+
+default_max_width = 1024
+
+
+class Atlas(object):
+    """A sheet surface and the rectangles of the images on it.
+
+    `rects` maps image names to pygame.Rects on `sheet`.
+
+    """
+
+    def __init__(self, sheet, rects):
+        self.sheet = sheet
+        self.rects = rects
+        self._images = {}
+
+    def __contains__(self, name):
+        return name in self.rects
+
+    def __len__(self):
+        return len(self.rects)
+
+    def image(self, name):
+        """The named image, as a subsurface of the sheet, or None."""
+        img = self._images.get(name)
+        if img is None:
+            rect = self.rects.get(name)
+            if rect is None:
+                return None
+            img = self._images[name] = self.sheet.subsurface(rect)
+        return img
+
+    def convert(self):
+        """Convert the sheet to the display's pixel format (see
+        Surface.convert_alpha); needs a display mode to be set."""
+        self.sheet = self.sheet.convert_alpha()
+        self._images.clear()
+
+    def save(self, path):
+        """Write the sheet to `path`.png and its index to `path`.json."""
+        pygame.image.save(self.sheet, path + '.png')
+        index = dict((name, list(rect)) for name, rect in self.rects.items())
+        with open(path + '.json', 'w') as f:
+            json.dump(index, f, indent=1, sort_keys=True)
+
+
+def pack(images, max_width=default_max_width, padding=1):
+    """Pack images (a dict of name -> surface) into a new Atlas.
+
+    Images are placed on shelves, tallest first, in a sheet at most
+    `max_width` pixels wide (unless an image is wider), with `padding`
+    transparent pixels between them so that scaling an image does not
+    bleed in its neighbors.
+    """
+    order = sorted(images, key=lambda name: (-images[name].get_height(),
+                                             -images[name].get_width(), name))
+    max_width = max([max_width] + [images[name].get_width() for name in order])
+
+    rects = {}
+    x = y = shelf_height = 0
+    for name in order:
+        w, h = images[name].get_size()
+        if x + w > max_width:
+            x, y = 0, y + shelf_height + padding
+            shelf_height = 0
+        rects[name] = pygame.Rect(x, y, w, h)
+        x += w + padding
+        shelf_height = max(shelf_height, h)
+
+    width = max([rect.right for rect in rects.values()] + [1])
+    height = max([rect.bottom for rect in rects.values()] + [1])
+    sheet = pygame.Surface((width, height), pygame.SRCALPHA, 32)
+    sheet.fill((0, 0, 0, 0))
+    for name, rect in rects.items():
+        # Onto a transparent sheet, MAX copies pixels and alpha exactly.
+        sheet.blit(images[name], rect, special_flags=pygame.BLEND_RGBA_MAX)
+    return Atlas(sheet, rects)
+
+
+def image_names():
+    """The names of the images in the search paths of the resource module,
+    an image in an earlier search path hiding one of the same name in a
+    later one."""
+    subdir, extension = resource.asset_types['image']
+    names = set()
+    for directory in resource.search_paths:
+        try:
+            files = os.listdir(os.path.join(directory, subdir))
+        except OSError:
+            continue
+        names.update(os.path.splitext(f)[0] for f in files
+                     if f.endswith(extension))
+    return sorted(names)
+
+
+def build(names=None, max_pixels=max_packed_pixels,
+          max_width=default_max_width):
+    """Pack the named images (by default, every image in the search paths)
+    of at most `max_pixels` pixels into a new Atlas."""
+    if names is None:
+        names = image_names()
+    images = {}
+    for name in names:
+        path = resource.find_asset('image', name)
+        if path is None:
+            continue
+        try:
+            img = pygame.image.load(path)
+        except pygame.error as e:
+            resource.logger.warning('failed to load image: %s: %s' % (path, e))
+            continue
+        if img.get_width() * img.get_height() <= max_pixels:
+            images[name] = img
+    return pack(images, max_width)
+
+
+def load(path):
+    """The Atlas saved to `path`.png and `path`.json, or None if either
+    is missing."""
+    try:
+        with open(path + '.json') as f:
+            index = json.load(f)
+        sheet = pygame.image.load(path + '.png')
+    except (IOError, OSError, ValueError, pygame.error) as e:
+        resource.logger.debug('no atlas at %s: %s' % (path, e))
+        return None
+    rects = dict((name, pygame.Rect(rect)) for name, rect in index.items())
+    return Atlas(sheet, rects)
+
+
+def install(path=None):
+    """Add an atlas of the images in the search paths to the resource
+    module. If `path` is given the atlas saved there is used, or if there
+    is none, built and saved there for next time. Call after
+    pygameui.init."""
+    atlas = load(path) if path is not None else None
+    if atlas is None:
+        atlas = build()
+        if path is not None:
+            atlas.save(path)
+    atlas.convert()
+    resource.add_atlas(atlas)
+    return atlas
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        sys.exit('usage: python -m pygameui.atlas OUTPUT [RESOURCE_DIR ...]\n'
+                 'Packs the images of pygameui and of the given resource\n'
+                 'directories into OUTPUT.png and OUTPUT.json.')
+    for directory in reversed(sys.argv[2:]):
+        resource.add_search_path(directory)
+    atlas = build()
+    atlas.save(sys.argv[1])
+    print('packed %d images into a %dx%d sheet' % (
+        (len(atlas),) + atlas.sheet.get_size()))
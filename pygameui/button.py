@@ -13,20 +13,29 @@ class Button(label.Label):
 
         on_clicked(button, mousebutton)
 
+    A zero width or height in the frame makes the button fit its caption
+    or take the theme's button height, and keep doing so when relaid out.
+
     """
 
     def __init__(self, frame, caption):
-        if frame.h == 0:
+        self._auto_width = frame.w == 0
+        self._auto_height = frame.h == 0
+        if self._auto_height:
             frame.h = theme.current.button_height
         label.Label.__init__(self, frame, caption)
         self._enabled = True
         self.on_clicked = callback.Signal()
 
     def layout(self):
+        if self._auto_height:
+            self.frame.h = self.theme.button_height
         label.Label.layout(self)
-        if self.frame.w == 0:
-            self.frame.w = self.text_size[0] + self.padding[0] * 2
-            label.Label.layout(self)
+        if self._auto_width:
+            width = self.text_size[0] + self.padding[0] * 2
+            if self.frame.w != width:
+                self.frame.w = width
+                label.Label.layout(self)
 
     def mouse_up(self, button, point):
         focus.set(None)
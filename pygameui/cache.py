@@ -0,0 +1,152 @@
+from collections import OrderedDict
+
+import pygame
+
+
+def surface_bytes(surface):
+    """Approximate memory used by the pixels of a surface."""
+    return surface.get_bytesize() * surface.get_width() * surface.get_height()
+
+
+class LRUCache(object):
+    """A least-recently-used cache bounded by a byte budget.
+
+    Each entry is stored along with its size in bytes. When the total
+    exceeds `max_bytes` the least recently used entries are evicted.
+    Entries larger than the whole budget are not stored at all.
+
+    Hit, miss and eviction counts are kept for tuning the budget.
+    `on_evict`, if given, is called with the key and value of each entry
+    evicted.
+
+    """
+
+    def __init__(self, max_bytes, on_evict=None):
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self._entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        try:
+            value, nbytes = self._entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        self._entries[key] = (value, nbytes)
+        self.hits += 1
+        return value
+
+    def put(self, key, value, nbytes):
+        self.discard(key)
+        if nbytes > self.max_bytes:
+            return
+        self._entries[key] = (value, nbytes)
+        self.bytes += nbytes
+        self.trim()
+
+    def discard(self, key):
+        try:
+            _, nbytes = self._entries.pop(key)
+        except KeyError:
+            return
+        self.bytes -= nbytes
+
+    def trim(self, max_bytes=None):
+        """Evict entries until at most `max_bytes` (default: the budget)
+        are used."""
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+        while self.bytes > max_bytes and self._entries:
+            key, (value, nbytes) = self._entries.popitem(last=False)
+            self.bytes -= nbytes
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(key, value)
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return dict(entries=len(self._entries),
+                    bytes=self.bytes,
+                    max_bytes=self.max_bytes,
+                    hits=self.hits,
+                    misses=self.misses,
+                    evictions=self.evictions,
+                    hit_rate=(self.hits / float(lookups) if lookups else 0.0))
+
+
+class SurfacePool(object):
+    """Recycles 32-bit SRCALPHA surfaces by size.
+
+    Surfaces given back with `release` are kept, up to `max_bytes` in
+    total, and handed out again by `acquire` for the same size instead
+    of allocating a new surface. Reused surfaces keep their old pixels
+    (callers are expected to repaint them) but not their clip.
+
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._free = {}
+        self.bytes = 0
+        self.allocations = 0
+        self.reuses = 0
+        self.kept = 0
+        self.discards = 0
+
+    def acquire(self, size):
+        size = (int(size[0]), int(size[1]))
+        free = self._free.get(size)
+        if free:
+            surface = free.pop()
+            self.bytes -= surface_bytes(surface)
+            self.reuses += 1
+            surface.set_clip(None)
+            return surface
+        self.allocations += 1
+        return pygame.Surface(size, pygame.SRCALPHA, 32)
+
+    def release(self, surface):
+        nbytes = surface_bytes(surface)
+        if self.bytes + nbytes > self.max_bytes:
+            self.discards += 1
+            return
+        self._free.setdefault(surface.get_size(), []).append(surface)
+        self.bytes += nbytes
+
+    def resize(self, surface, size):
+        """A surface of the given size: `surface` itself if it already has
+        that size, otherwise one from the pool (and `surface`, if any, is
+        released)."""
+        if surface is not None:
+            if surface.get_size() == tuple(size):
+                self.kept += 1
+                return surface
+            self.release(surface)
+        return self.acquire(size)
+
+    def clear(self):
+        self._free.clear()
+        self.bytes = 0
+
+    def stats(self):
+        return dict(free=sum(len(free) for free in self._free.values()),
+                    bytes=self.bytes,
+                    max_bytes=self.max_bytes,
+                    allocations=self.allocations,
+                    reuses=self.reuses,
+                    kept=self.kept,
+                    discards=self.discards)
@@ -1,21 +1,151 @@
+"""Signals and slots.
+
+Methods of views are connected weakly by default, so that a signal does
+not keep views alive after they leave the tree; other slots, including
+methods of other objects, are kept alive by the signal as before.
+"""
+
+try:
+    from weakref import WeakMethod
+except ImportError:     # Python 2
+    WeakMethod = None
+
+
+# Queued signals with an emission waiting for deliver_queued.
+_queued = []
 
 
 class Signal(object):
-    "A simple signal - slot mechanism"
+    """A simple signal - slot mechanism
 
-    # TODO use weak refs? really?
+    Methods of views are connected weakly (where weakref.WeakMethod
+    exists): the signal does not keep the view alive, and the slot is
+    dropped when the view is collected. Pass weak=True or weak=False to
+    connect to choose for any bound method.
 
-    def __init__(self):
-        self.slots = []
+    A queued signal does not call its slots when emitted. The run loop
+    delivers it once per frame (see deliver_queued) with the arguments of
+    the last emission, so a burst of emissions in a frame costs one call.
 
-    def connect(self, slot):
+    """
+
+    def __init__(self, queued=False):
+        self.slots = ()     # callables, or WeakMethods of callables
+        self.queued = queued
+        self._pending = None    # (args, kwargs) of the last emission
+
+    def connect(self, slot, weak=None):
         "slot: is a function / method"
 
         assert callable(slot)
-        self.slots.append(slot)
+        owner = getattr(slot, '__self__', None)
+        if (owner is not None and hasattr(slot, '__func__') and
+                WeakMethod is not None):
+            if weak is None:
+                from . import view
+                weak = isinstance(owner, view.View)
+            if weak:
+                slot = WeakMethod(slot, self._drop)
+        self.slots += (slot,)
+
+    def disconnect(self, slot):
+        "Disconnect slot if it is connected."
+
+        self.slots = tuple(s for s in self.slots if _resolve(s) != slot)
+
+    def _drop(self, ref):
+        self.slots = tuple(s for s in self.slots if s is not ref)
 
     def __call__(self, *args, **kwargs):
         "Fire the signal to connected slots"
 
+        if not self.slots:
+            return
+        if self.queued:
+            if self._pending is None:
+                _queued.append(self)
+            self._pending = (args, kwargs)
+            return
+        self._emit(args, kwargs)
+
+    def _emit(self, args, kwargs):
+        # Slots connected or dropped while emitting take effect next time.
         for slot in self.slots:
+            if type(slot) is WeakMethod:
+                slot = slot()
+                if slot is None:
+                    continue
             slot(*args, **kwargs)
+
+
+def _resolve(slot):
+    if type(slot) is WeakMethod:
+        return slot()
+    return slot
+
+
+def deliver_queued():
+    """Call the slots of each queued signal emitted since the last call
+    once, with the arguments of its last emission. Emissions made by the
+    slots are delivered too.
+    """
+    while _queued:
+        signals = list(_queued)
+        del _queued[:]
+        for signal in signals:
+            pending, signal._pending = signal._pending, None
+            if pending is not None:
+                signal._emit(*pending)
+
+
+class LazySignal(object):
+    """A Signal attribute of a class whose instances create their Signal
+    when it is first connected to.
+
+    Until then, getting the attribute gives a stand-in that ignores
+    emissions. The class keeps the signals of an instance in a dict
+    (or None) in its `_signals` attribute.
+    """
+
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, obj, cls=None):
+        if obj is None:
+            return self
+        signals = obj._signals
+        if signals is not None:
+            signal = signals.get(self.name)
+            if signal is not None:
+                return signal
+        return _Unconnected(obj, self.name)
+
+    def __set__(self, obj, signal):
+        if obj._signals is None:
+            obj._signals = {}
+        obj._signals[self.name] = signal
+
+
+class _Unconnected(object):
+    """A LazySignal of an instance that has not been connected to yet."""
+
+    __slots__ = ('obj', 'name')
+
+    slots = ()
+
+    def __init__(self, obj, name):
+        self.obj = obj
+        self.name = name
+
+    def connect(self, slot, weak=None):
+        signal = Signal()
+        setattr(self.obj, self.name, signal)
+        signal.connect(slot, weak)
+
+    def disconnect(self, slot):
+        pass
+
+    def __call__(self, *args, **kwargs):
+        pass
@@ -20,7 +20,7 @@ class Checkbox(view.View):
     def __init__(self, frame, text):
         view.View.__init__(self, frame)
 
-        self.checked = False
+        self._checked = False
 
         check_frame = pygame.Rect(0, 0, 1, 1)
         self.check_label = label.Label(check_frame, ' ')
@@ -32,6 +32,24 @@ class Checkbox(view.View):
         self.on_checked = callback.Signal()
         self.on_unchecked = callback.Signal()
 
+    @property
+    def checked(self):
+        return self._checked
+
+    @checked.setter
+    def checked(self, checked):
+        self._checked = checked
+        self.check_label.text = 'X' if checked else ' '
+
+    @property
+    def text(self):
+        return self.label.text
+
+    @text.setter
+    def text(self, text):
+        self.label.text = text
+        self.set_needs_layout()
+
     def layout(self):
         self.check_label.frame.topleft = self.padding
         check_size = theme.current.label_height - self.padding[1] * 2
@@ -60,10 +78,8 @@ class Checkbox(view.View):
     def toggle(self, *args, **kwargs):
         self.checked = not self.checked
         if self.checked:
-            self.check_label.text = 'X'
             self.on_checked()
         else:
-            self.check_label.text = ' '
             self.on_unchecked()
 
     def __repr__(self):
@@ -1,6 +1,7 @@
 import pygame
 
 from . import view
+from . import resource
 
 
 class FlipbookView(view.View):
@@ -26,10 +27,13 @@ class FlipbookView(view.View):
 
         image
 
-            the spritesheet image.
+            the spritesheet image, or the name of one to load with
+            resource.get_image.
 
         """
         view.View.__init__(self, frame)
+        if not hasattr(image, 'get_size'):
+            image = resource.get_image(image)
         self.image = image
         self.frame_count = self.image.get_size()[0] // frame.size[0]
         self.current_frame = 0
@@ -42,6 +46,9 @@ class FlipbookView(view.View):
         if self.elapsed > self.delay:
             self.current_frame = (self.current_frame + 1) % self.frame_count
             self.elapsed = 0
+            self.set_needs_display()
+        if not self.hidden:
+            self.request_update(self.delay - self.elapsed)
 
     def draw(self):
         if not view.View.draw(self):
@@ -4,6 +4,7 @@ from . import view
 from . import callback
 from . import imageview
 from . import focus
+from . import resource
 
 
 class ImageButton(view.View):
@@ -16,10 +17,19 @@ class ImageButton(view.View):
     """
 
     def __init__(self, frame, image):
+        """`image` is an image, the name of one or a handle of one
+        being loaded (see ImageView)."""
+        if isinstance(image, resource.ImageHandle):
+            size = image.image.get_size()
+        elif hasattr(image, 'get_size'):
+            size = image.get_size()
+        else:
+            size = resource.get_image(image).get_size()
+
         if frame is None:
-            frame = pygame.Rect((0, 0), image.get_size())
+            frame = pygame.Rect((0, 0), size)
         elif frame.w == 0 or frame.h == 0:
-            frame.size = image.get_size()
+            frame.size = size
 
         view.View.__init__(self, frame)
 
@@ -27,8 +37,12 @@ class ImageButton(view.View):
 
         self.image_view = imageview.ImageView(pygame.Rect(0, 0, 0, 0), image)
         self.image_view._enabled = False
+        self.image_view.on_image_loaded.connect(self._image_loaded)
         self.add_child(self.image_view)
 
+    def _image_loaded(self, image_view):
+        self.set_needs_layout()
+
     def layout(self):
         self.frame.w = self.padding[0] * 2 + self.image_view.frame.w
         self.frame.h = self.padding[1] * 2 + self.image_view.frame.h
@@ -2,6 +2,7 @@ import pygame
 
 from . import view
 from . import resource
+from . import callback
 
 
 SCALE_TO_FILL = 0
@@ -12,11 +13,24 @@ class ImageView(view.View):
 
     The only 'content scaling mode' currently supported is 'scale-to-fill'.
 
+    Signals
+
+        on_image_loaded(image_view)
+
     """
 
     def __init__(self, frame, img, content_mode=SCALE_TO_FILL):
         """Create an image view from an image.
 
+        img
+
+            the image, or the name of one to load with
+            resource.get_image; images loaded by name are also
+            scaled through (and cached by) resource.get_image.
+            May also be a handle from resource.load_image_async;
+            its placeholder is shown until the image is loaded, and
+            then the view is relaid out with the image.
+
         frame.topleft
 
             where to position the view.
@@ -28,11 +42,19 @@ class ImageView(view.View):
 
         """
 
+        image_name = handle = None
+        if isinstance(img, resource.ImageHandle):
+            handle, img = img, img.image
+        elif not hasattr(img, 'get_size'):
+            image_name, img = img, resource.get_image(img)
+
         assert img is not None
 
+        self._sized_to_image = frame is None or (frame.w == 0 and
+                                                 frame.h == 0)
         if frame is None:
             frame = pygame.Rect((0, 0), img.get_size())
-        elif frame.w == 0 and frame.h == 0:
+        elif self._sized_to_image:
             frame.size = img.get_size()
 
         view.View.__init__(self, frame)
@@ -40,6 +62,11 @@ class ImageView(view.View):
         self._enabled = False
         self.content_mode = content_mode
         self.image = img
+        self.image_name = image_name
+
+        self.on_image_loaded = callback.Signal()
+        if handle is not None and not handle.loaded:
+            handle.on_loaded.connect(self._image_loaded)
 
     @property
     def image(self):
@@ -47,26 +74,44 @@ class ImageView(view.View):
 
     @image.setter
     def image(self, new_image):
-        self._image = new_image
+        self._source_image = self._image = new_image
+        self.image_name = None
+        self.set_needs_display()
+
+    def _image_loaded(self, handle):
+        self.image = handle.image
+        if self._sized_to_image:
+            self.frame.size = self.image.get_size()
+        self.set_needs_layout()
+        self.on_image_loaded(self)
 
     def layout(self):
         assert self.padding[0] == 0 and self.padding[1] == 0
         if self.content_mode == SCALE_TO_FILL:
-            self._image = resource.scale_image(self._image, self.frame.size)
+            size = tuple(self.frame.size)
+            if self.image_name is not None:
+                self._image = resource.get_image(self.image_name, size)
+            elif self._image.get_size() != size:
+                # Scale the original, not an earlier scaled copy.
+                self._image = resource.scale_image(self._source_image, size)
         else:
             assert False, "Unknown content_mode"
         view.View.layout(self)
 
     def draw(self):
+        if self.hidden or not self._dirty:
+            return False
         self.surface = self._image
+        self.drawn_rects = [self.surface.get_rect()]
+        self._dirty = False
+        self._needs_display = False
+        return True
 
 
 def view_for_image_named(image_name):
     """Create an ImageView for the given image."""
 
-    image = resource.get_image(image_name)
-
-    if not image:
+    if resource.get_image(image_name) is None:
         return None
 
-    return ImageView(pygame.Rect(0, 0, 0, 0), image)
+    return ImageView(pygame.Rect(0, 0, 0, 0), image_name)
@@ -21,6 +21,10 @@ Note that a KeyError or IndexError encountered while walking a
 key path part spec is not caught. You have to know that the a
 walk of the given key path on the given object will work.
 
+Key paths are parsed once; `getter` and `setter` return the cached
+callables that walk them, and `apply_values` sets many at once. Run
+this module to compare them with parsing every walk.
+
 An example walk:
 
     class A(object):
@@ -49,6 +53,11 @@ __version__ = '0.1.0'
 
 list_index_re = re.compile(r'([^\[]+)\[(\d+)\]')
 
+# Key paths are compiled once into getter and setter callables; see
+# `getter` and `setter`.
+_getters = {}
+_setters = {}
+
 
 def _extract(val, key):
     if isinstance(val, dict):
@@ -56,9 +65,119 @@ def _extract(val, key):
     return getattr(val, key, None)
 
 
+def _compile_parts(path):
+    """The (name, index) pairs of a key path; index is None for parts
+    without a list index."""
+    parts = []
+    for part in path.split('.'):
+        match = re.match(list_index_re, part)
+        if match is not None:
+            parts.append((match.group(1), int(match.group(2))))
+        else:
+            parts.append((part, None))
+    return parts
+
+
+def _step(val, name, index):
+    val = _extract(val, name)
+    if index is not None:
+        if not isinstance(val, list) and not isinstance(val, tuple):
+            raise TypeError('expected list/tuple')
+        val = val[index]
+    return val
+
+
+def getter(path):
+    """A callable that returns the value at key path `path` of the object
+    it is called with, as `value_for_keypath` does.
+    """
+    try:
+        return _getters[path]
+    except KeyError:
+        pass
+
+    parts = _compile_parts(path)
+    if len(parts) == 1 and parts[0][1] is None:
+        name = path
+
+        def get_value(obj):
+            if isinstance(obj, dict):
+                return obj[name]
+            return getattr(obj, name, None)
+    else:
+        def get_value(obj):
+            val = obj
+            for name, index in parts:
+                val = _step(val, name, index)
+                if val is None:
+                    return None
+            return val
+
+    _getters[path] = get_value
+    return get_value
+
+
+def setter(path):
+    """A callable taking an object and a value that sets the value at key
+    path `path` of the object, as `set_value_for_keypath` does.
+    """
+    try:
+        return _setters[path]
+    except KeyError:
+        pass
+
+    parts = _compile_parts(path)
+    walk, (last_name, last_index) = parts[:-1], parts[-1]
+    if not walk and last_index is None:
+        name = path
+
+        def set_value(obj, new_value):
+            if isinstance(obj, dict):
+                obj[name] = new_value
+            else:
+                setattr(obj, name, new_value)
+    else:
+        def set_value(obj, new_value):
+            dst = obj
+            for name, index in walk:
+                dst = _step(dst, name, index)
+            if last_index is not None:
+                dst = _extract(dst, last_name)
+                if not isinstance(dst, list) and not isinstance(dst, tuple):
+                    raise TypeError('expected list/tuple')
+                dst[last_index] = new_value
+            elif isinstance(dst, dict):
+                dst[last_name] = new_value
+            else:
+                setattr(dst, last_name, new_value)
+
+    _setters[path] = set_value
+    return set_value
+
+
 def value_for_keypath(obj, path):
     """Get value from walking key path with start object obj.
     """
+    return getter(path)(obj)
+
+
+def set_value_for_keypath(obj, path, new_value):
+    """Set attribute value new_value at key path of start object obj.
+    """
+    setter(path)(obj, new_value)
+
+
+def apply_values(obj, mapping):
+    """Set the value of each key path of dict `mapping` at that key path
+    of start object obj.
+    """
+    for path, new_value in mapping.items():
+        setter(path)(obj, new_value)
+
+
+def _walk_value_for_keypath(obj, path):
+    """value_for_keypath without compiling the key path; for `benchmark`.
+    """
     val = obj
     for part in path.split('.'):
         match = re.match(list_index_re, part)
@@ -75,8 +194,9 @@ def value_for_keypath(obj, path):
     return val
 
 
-def set_value_for_keypath(obj, path, new_value):
-    """Set attribute value new_value at key path of start object obj.
+def _walk_set_value_for_keypath(obj, path, new_value):
+    """set_value_for_keypath without compiling the key path; for
+    `benchmark`.
     """
     parts = path.split('.')
     last_part = len(parts) - 1
@@ -102,6 +222,34 @@ def set_value_for_keypath(obj, path, new_value):
                     setattr(dst, part, new_value)
 
 
+def benchmark(number=100000):
+    """Print microseconds per get and set of a few key paths, walked
+    every time vs. compiled."""
+    import timeit
+
+    class A(object):
+        def __init__(self):
+            self.x = dict(y=['hello', 'world'])
+
+    class B(object):
+        def __init__(self):
+            self.a = A()
+            self.color = (0, 0, 0)
+
+    print('%-12s %-10s %10s %10s' % ('key path', 'op', 'walked', 'compiled'))
+    for path, value in (('color', (1, 2, 3)), ('a.x', {}), ('a.x.y[1]', 2)):
+        b = B()
+        for op, walked, compiled in (
+                ('get', lambda: _walk_value_for_keypath(b, path),
+                 lambda: value_for_keypath(b, path)),
+                ('set', lambda: _walk_set_value_for_keypath(b, path, value),
+                 lambda: set_value_for_keypath(b, path, value))):
+            times = [min(timeit.repeat(fn, number=number, repeat=3)) /
+                     number * 1e6 for fn in (walked, compiled)]
+            print('%-12s %-10s %10.3f %10.3f' % (path, op, times[0],
+                                                 times[1]))
+
+
 if __name__ == '__main__':
     class A(object):
         def __init__(self):
@@ -116,3 +264,9 @@ if __name__ == '__main__':
 
     set_value_for_keypath(b, 'a.x.y[1]', 2)
     assert value_for_keypath(b, 'a.x.y[1]') == 2
+
+    apply_values(b, {'a.x.y[0]': 1, 'a.x.z': 3})
+    assert value_for_keypath(b, 'a.x.y[0]') == 1
+    assert value_for_keypath(b, 'a.x.z') == 3
+
+    benchmark()
@@ -1,6 +1,8 @@
 import re
 
 from . import view
+from . import render
+from . import resource
 
 
 CENTER = 0
@@ -43,7 +45,10 @@ class Label(view.View):
 
             The text to render.
 
-            Changing the text forces a redraw of the label.
+            Changing the text forces a redraw of the label. The
+            text is rendered once, before the label is next drawn
+            or its text_size is read, however often it changes
+            before then.
 
 
     Style attributes:
@@ -78,18 +83,40 @@ class Label(view.View):
             Horizontal and vertical spacing from the label's
             interior edges where text is rendered.
 
+        glyph_atlas
+
+            If True, the text is drawn glyph by glyph from an atlas
+            of the font's pre-rendered glyphs (see render.GlyphAtlas)
+            rather than rendered to new surfaces each time it changes.
+            Use this for text that changes often, such as counters,
+            timers and FPS readouts. Text with characters the atlas
+            lacks is rendered as usual.
+
     """
 
     def __init__(self, frame, text,
                  halign=CENTER, valign=CENTER,
                  wrap=CLIP):
 
+        self._wrap_mode = wrap     # before the frame is set
+        self._wrap_width = None    # the frame width the text is wrapped to
         view.View.__init__(self, frame)
         self.halign = halign
         self.valign = valign
-        self._wrap_mode = wrap
         self._text = text
         self._enabled = False
+        self.text_surfaces, self.text_shadow_surfaces = [], []
+        self.glyph_lines = None
+        self._text_size = (0, 0)
+        self._needs_render = False
+        self._rendered_inputs = None
+        self.glyph_atlas = False
+
+        # From the last render, for reuse by the next one: the lines of
+        # each wrapped paragraph and the surfaces of each line.
+        self._wrapped_paragraphs = {}
+        self._line_style = None
+        self._line_surfaces = {}
 
     @property
     def text(self):
@@ -98,32 +125,92 @@ class Label(view.View):
     @text.setter
     def text(self, text):
         self._text = text
-        self.render()
+        self._rewrap_to_frame()
+        self.set_needs_render()
 
     @property
     def wrap_mode(self):
         return self._wrap_mode
 
-    @property
+    @wrap_mode.setter
     def wrap_mode(self, mode):
         self._wrap_mode = mode
-        self.render()
+        self._rewrap_to_frame()
+        self.set_needs_render()
+
+    def _rewrap_to_frame(self):
+        # A wrap kept for a narrowed frame (see _frame_changed) only holds
+        # for the text it was made for.
+        self._wrap_width = self.frame.w if self.frame is not None else None
+
+    @property
+    def text_size(self):
+        if self._needs_render:
+            self._render_if_needed()
+        return self._text_size
 
     def layout(self):
-        self.render()
+        self._render_if_needed()
         view.View.layout(self)
 
+    def set_needs_render(self):
+        """Have the text rendered again before it is next needed."""
+        self._needs_render = True
+        self.set_needs_display()
+
+    def _style_changed(self):
+        # Text colors and shadows are rendered into the text surfaces.
+        self.set_needs_render()
+
+    def _frame_changed(self):
+        view.View._frame_changed(self)
+        width = self.frame.w if self.frame is not None else None
+        if width == self._wrap_width:
+            return
+        # Narrowing the frame keeps the wrapped lines while they still fit
+        # (as after shrink_wrap); re-wrapping at the width of the widest
+        # line would break it again.
+        if (self._wrap_width is None or self._rendered_inputs is None or
+                self._needs_render or width > self._wrap_width or
+                width < self._text_size[0] + self.padding[0] * 2):
+            self._wrap_width = width
+            if self._wrap_mode == WORD_WRAP:
+                self._needs_render = True   # may wrap differently
+
+    def layout_if_needed(self):
+        view.View.layout_if_needed(self)
+        if self._needs_render and not self._hidden:
+            self._render_if_needed()
+
     def render(self):
         """Force (re)draw the text to cached surfaces.
         """
+        self._needs_render = False
+        if view.render_stats is not None:
+            view.render_stats.count(self, 'render')
         self._render(self._text)
+        self._rendered_inputs = self._render_inputs()
+        self.set_needs_display()
+
+    def _render_inputs(self):
+        """Everything the rendered text depends on."""
+        return (self._text, self._wrap_mode, self.font, self.text_color,
+                self.text_shadow_color, self.text_shadow_offset,
+                self.glyph_atlas, self.padding,
+                self._wrap_width if self._wrap_mode == WORD_WRAP else None)
+
+    def _render_if_needed(self):
+        self._needs_render = False
+        if self._render_inputs() != self._rendered_inputs:
+            self.render()
 
     def _render(self, text):
         self.text_surfaces, self.text_shadow_surfaces = [], []
+        self.glyph_lines = None
 
         if text is None or len(text) == 0:
             self._text = None
-            self.text_size = (0, 0)
+            self._text_size = (0, 0)
             return
 
         text = text.replace("\r\n", "\n").replace("\r", "\n")
@@ -132,57 +219,123 @@ class Label(view.View):
 
         if self._wrap_mode == CLIP:
             self._text = re.sub(r'[\n\t]{2, }', ' ', text)
-            self.text_size = self._render_line(self._text, wants_shadows)
+            lines = [self._text]
         elif self._wrap_mode == WORD_WRAP:
-            self._render_word_wrapped(text, wants_shadows)
+            self._text = text
+            lines = self._wrap(text)
+        if not (self.glyph_atlas and self._layout_glyph_lines(lines)):
+            self._render_lines(lines, wants_shadows)
+
+    def _layout_glyph_lines(self, lines):
+        """Lay out lines to draw from the glyph atlas; False if the atlas
+        cannot draw them."""
+
+        atlas = render.get_glyph_atlas(self.font, self.text_color)
+        glyph_lines = []
+        for line_text in lines:
+            line = atlas.layout(self.font, line_text.strip())
+            if line is None:
+                return False
+            glyph_lines.append(line)
+
+        self.glyph_lines = glyph_lines
+        self._text_size = [max(width for width, _ in glyph_lines),
+                          atlas.height * len(glyph_lines)]
+        self._line_style, self._line_surfaces = None, {}
+        return True
+
+    def _render_lines(self, lines, wants_shadows):
+        """Render each line of text, reusing the surfaces of lines that
+        were rendered last time in the same style."""
+
+        style = (self.font, self.text_color,
+                 self.text_shadow_color if wants_shadows else None)
+        if style == self._line_style:
+            previous = self._line_surfaces
+        else:
+            previous = {}
+        self._line_style, self._line_surfaces = style, {}
+
+        self._text_size = [0, 0]
+        for line_text in lines:
+            line_text = line_text.strip()
+            surfaces = (self._line_surfaces.get(line_text) or
+                        previous.get(line_text))
+            if surfaces is None:
+                surfaces = self._render_line(line_text, wants_shadows)
+            self._line_surfaces[line_text] = surfaces
+
+            text_surface, text_shadow_surface = surfaces
+            self.text_surfaces.append(text_surface)
+            if wants_shadows:
+                self.text_shadow_surfaces.append(text_shadow_surface)
+
+            line_w, line_h = text_surface.get_size()
+            self._text_size[0] = max(self._text_size[0], line_w)
+            self._text_size[1] += line_h
 
     def _render_line(self, line_text, wants_shadows):
-        line_text = line_text.strip()
-        text_surface = self.font.render(line_text, True, self.text_color)
-        self.text_surfaces.append(text_surface)
+        text_surface = render.render_text(self.font, line_text,
+                                          self.text_color)
+        text_shadow_surface = None
         if wants_shadows:
-            text_shadow_surface = self.font.render(
-                line_text, True, self.text_shadow_color)
-            self.text_shadow_surfaces.append(text_shadow_surface)
-        return text_surface.get_size()
+            text_shadow_surface = render.render_text_shadow(
+                self.font, line_text, self.text_color, self.text_shadow_color)
+        return text_surface, text_shadow_surface
 
-    def _render_word_wrapped(self, text, wants_shadows):
-        self._text = text
-        self.text_size = [0, 0]
+    def _wrap(self, text):
+        """Break text into lines that fit the width of the label.
 
-        line_width = 0
-        max_line_width = self.frame.w - self.padding[0] * 2
+        Paragraphs are wrapped separately; those wrapped to the same
+        width last time are not wrapped again.
+        """
 
+        max_line_width = self._wrap_width - self.padding[0] * 2
+
+        paragraphs = text.split('\n')
+        if paragraphs[-1] == '':
+            paragraphs.pop()    # a trailing newline adds no empty line
+
+        previous, self._wrapped_paragraphs = self._wrapped_paragraphs, {}
+
+        # Measure the words of all paragraphs to wrap in one go.
+        unwrapped = [paragraph for paragraph in paragraphs
+                     if (self.font, max_line_width, paragraph) not in previous]
+        if len(unwrapped) > 1:
+            resource.measure_many(self.font, [
+                token for token in re.split(r'(\s)', '\n'.join(unwrapped))
+                if token and token != '\n'])
+
+        lines = []
+        for paragraph in paragraphs:
+            key = (self.font, max_line_width, paragraph)
+            paragraph_lines = (self._wrapped_paragraphs.get(key) or
+                               previous.get(key))
+            if paragraph_lines is None:
+                paragraph_lines = self._wrap_paragraph(paragraph,
+                                                       max_line_width)
+            self._wrapped_paragraphs[key] = paragraph_lines
+            lines.extend(paragraph_lines)
+        return lines
+
+    def _wrap_paragraph(self, paragraph, max_line_width):
+        lines = []
+        line_width = 0
         line_tokens = []
-        tokens = re.split(r'(\s)', self._text)
-        token_widths = {}
-
-        for token in tokens:
-            if len(token) == 0:
-                continue
-
-            token_width, _ = token_widths.setdefault(token,
-                                                     self.font.size(token))
-
-            if token == '\n' or token_width + line_width >= max_line_width:
-                line_size = self._render_line(''.join(line_tokens),
-                                              wants_shadows)
-                self.text_size[0] = max(self.text_size[0], line_size[0])
-                self.text_size[1] += line_size[1]
-
-                if token == '\n':
-                    line_tokens, line_width = [], 0
-                else:
-                    line_tokens, line_width = [token], token_width
+
+        tokens = [token for token in re.split(r'(\s)', paragraph) if token]
+        widths = resource.measure_many(self.font, tokens)
+
+        for token, width in zip(tokens, widths):
+            if width + line_width >= max_line_width:
+                lines.append(''.join(line_tokens))
+                line_tokens, line_width = [token], width
             else:
-                line_width += token_width
+                line_width += width
                 line_tokens.append(token)
 
-        if len(line_tokens) > 0:
-            line_size = self._render_line(''.join(line_tokens),
-                                          wants_shadows)
-            self.text_size[0] = max(self.text_size[0], line_size[0])
-            self.text_size[1] += line_size[1]
+        lines.append(''.join(line_tokens))
+        return lines
 
     def shrink_wrap(self):
         """Tightly bound the current text respecting current padding."""
@@ -199,8 +352,7 @@ class Label(view.View):
             y = self.frame.h - self.padding[1] - self.text_size[1]
         return y
 
-    def _determine_left(self, text_surface):
-        w = text_surface.get_size()[0]
+    def _determine_left(self, w):
         if self.halign == LEFT:
             x = self.padding[0]
         elif self.halign == CENTER:
@@ -210,16 +362,25 @@ class Label(view.View):
         return x
 
     def draw(self):
-        if not view.View.draw(self) or not self._text:
+        if self._needs_render:
+            self._render_if_needed()
+
+        if not view.View.draw(self):
             return False
+        if not self._text:
+            return True     # the background was repainted
 
         wants_shadows = (self.text_shadow_color is not None and
                          self.text_shadow_offset is not None)
 
         y = self._determine_top()
 
+        if self.glyph_lines is not None:
+            self._draw_glyph_lines(y, wants_shadows)
+            return True
+
         for index, text_surface in enumerate(self.text_surfaces):
-            x = self._determine_left(text_surface)
+            x = self._determine_left(text_surface.get_width())
 
             if wants_shadows:
                 text_shadow_surface = self.text_shadow_surfaces[index]
@@ -232,6 +393,23 @@ class Label(view.View):
 
         return True
 
+    def _draw_glyph_lines(self, y, wants_shadows):
+        atlas = render.get_glyph_atlas(self.font, self.text_color)
+        if wants_shadows:
+            shadow_atlas = render.get_glyph_atlas(self.font,
+                                                  self.text_shadow_color)
+
+        for width, glyphs in self.glyph_lines:
+            x = self._determine_left(width)
+
+            if wants_shadows:
+                shadow_atlas.draw(self.surface, glyphs,
+                                  (x + self.text_shadow_offset[0],
+                                   y + self.text_shadow_offset[1]))
+
+            atlas.draw(self.surface, glyphs, (x, y))
+            y += atlas.height
+
     def __repr__(self):
         if self._text is None:
             return ''
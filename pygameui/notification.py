@@ -47,6 +47,7 @@ class NotificationView(dialog.DialogView):
         assert self.padding[0] == 0 and self.padding[1] == 0
         self.message_label.shrink_wrap()
         self.message_label.frame.w = self.frame.w
+        self.message_label.layout()
         self.frame.h = self.message_label.frame.h
         dialog.DialogView.layout(self)
 
@@ -69,15 +70,18 @@ class NotificationView(dialog.DialogView):
                 self.frame.top = min(self.frame.top, 0)
             else:
                 self.animation_state = IDLE
+            self.request_update()
         elif self.animation_state == UP:
             if self.frame.top > -self.frame.h:
                 self.frame.top -= dt * rate
+                self.request_update()
             else:
                 self.rm()
-        elif self.animation_state == IDLE:
+        elif self.animation_state == IDLE and self.auto_close:
             self.elapsed += dt
             if self.elapsed > self.auto_close_after:
                 self.animation_state = UP
+            self.request_update(self.auto_close_after - self.elapsed)
 
 
 def show_notification(message):
@@ -1,5 +1,38 @@
 import pygame
 
+from . import cache
+from . import resource
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Per-pixel work is vectorized with NumPy via pygame.surfarray when NumPy
+# is installed. Set to False to force the pure Pygame code paths.
+accelerated = numpy is not None
+
+# Rendered gradients keyed by (start color, end color, size, vertical).
+gradient_cache = cache.LRUCache(16 * 1024 * 1024)
+
+# Drop shadows keyed by (size, blur); shared by all views of a size.
+shadow_cache = cache.LRUCache(16 * 1024 * 1024)
+
+# Rendered text keyed by (font, text, color, antialias); shared by all
+# labels. Cleared when the theme changes.
+text_cache = cache.LRUCache(8 * 1024 * 1024)
+
+# Glyph atlases keyed by (font, color); see GlyphAtlas.
+glyph_atlas_cache = cache.LRUCache(4 * 1024 * 1024)
+
+# Make text shadows by tinting the glyph coverage of the rendered text
+# rather than rendering the text a second time with the font. SDL_ttf
+# caches rasterized glyphs, so a second font.render is cheap and measures
+# faster than tinting with the pygame 2 / SDL_ttf 2 builds we have tried
+# (see `pygameui-benchmark.py text_shadows`); hence off by default.
+tint_text_shadows = False
+
 
 def fill_gradient(surface, color, gradient,
                   rect=None, vertical=True, forward=True):
@@ -26,44 +59,119 @@ def fill_gradient(surface, color, gradient,
 
         True=forward; False=reverse
 
+    Colors may be RGB or RGBA. If either has an alpha other than 255,
+    the alpha is interpolated too and the filled pixels are replaced
+    rather than blended, just like `Surface.fill`.
+
+    Gradients are rendered once per colors, size and direction and kept
+    in `gradient_cache`, so filling is usually a single blit.
+
     See http://www.pygame.org/wiki/GradientCode
     """
 
     if rect is None:
         rect = surface.get_rect()
 
-    x1, x2 = rect.left, rect.right
-    y1, y2 = rect.top, rect.bottom
-
-    if vertical:
-        h = y2 - y1
-    else:
-        h = x2 - x1
-
-    assert h > 0
+    if rect.w <= 0 or rect.h <= 0:
+        return      # e.g. a progress bar's value at (nearly) zero
 
     if forward:
         a, b = color, gradient
     else:
         b, a = color, gradient
 
-    rate = (float(b[0] - a[0]) / h,
-            float(b[1] - a[1]) / h,
-            float(b[2] - a[2]) / h)
+    key = (tuple(a), tuple(b), tuple(rect.size), vertical)
+    image = gradient_cache.get(key)
+    if image is None:
+        image = render_gradient(rect.size, a, b, vertical)
+        gradient_cache.put(key, image, cache.surface_bytes(image))
+
+    if image.get_flags() & pygame.SRCALPHA:
+        # Replace rather than blend: clear, then add the gradient.
+        surface.fill((0, 0, 0, 0), rect)
+        surface.blit(image, rect.topleft, special_flags=pygame.BLEND_RGBA_ADD)
+    else:
+        surface.blit(image, rect.topleft)
+
+
+def _has_alpha(color):
+    return len(color) == 4 and color[3] != 255
+
+
+def render_gradient(size, a, b, vertical=True):
+    """Render a linear gradient from color `a` to color `b` to a new
+    surface of the given size.
+
+    The surface has per-pixel alpha only if either color is translucent.
+    """
+
+    if _has_alpha(a) or _has_alpha(b):
+        a, b = _rgba(a), _rgba(b)
+        surface = pygame.Surface(size, pygame.SRCALPHA, 32)
+    else:
+        a, b = tuple(a[:3]), tuple(b[:3])
+        surface = pygame.Surface(size, 0, 32)
+
+    if accelerated:
+        _render_gradient_surfarray(surface, a, b, vertical)
+    else:
+        _render_gradient_lines(surface, a, b, vertical)
+
+    return surface
+
+
+def _rgba(color):
+    if len(color) == 4:
+        return tuple(color)
+    return tuple(color) + (255,)
+
+
+def _gradient_steps(size, vertical):
+    if vertical:
+        return size[1]
+    return size[0]
+
+
+def _render_gradient_lines(surface, a, b, vertical):
+    w, h = surface.get_size()
+    steps = _gradient_steps((w, h), vertical)
+    rates = [float(b[i] - a[i]) / steps for i in range(len(a))]
 
     fn_line = pygame.draw.line
+    for step in range(steps):
+        color = tuple(min(max(a[i] + (rates[i] * step), 0), 255)
+                      for i in range(len(a)))
+        if vertical:
+            fn_line(surface, color, (0, step), (w - 1, step))
+        else:
+            fn_line(surface, color, (step, 0), (step, h - 1))
+
+
+def _render_gradient_surfarray(surface, a, b, vertical):
+    import pygame.surfarray
+
+    w, h = surface.get_size()
+    steps = _gradient_steps((w, h), vertical)
+
+    # Same arithmetic as the line-based version so results are identical.
+    a = numpy.array(a, dtype=numpy.float64)
+    rates = (numpy.array(b, dtype=numpy.float64) - a) / steps
+    ramp = a + rates * numpy.arange(steps)[:, numpy.newaxis]
+    ramp = numpy.clip(ramp, 0, 255).astype(numpy.uint8)
+
+    # surfarray arrays are indexed [x][y].
     if vertical:
-        for line in range(y1, y2):
-            color = (min(max(a[0] + (rate[0] * (line - y1)), 0), 255),
-                     min(max(a[1] + (rate[1] * (line - y1)), 0), 255),
-                     min(max(a[2] + (rate[2] * (line - y1)), 0), 255))
-            fn_line(surface, color, (x1, line), (x2, line))
+        pixels = numpy.broadcast_to(ramp[numpy.newaxis, :, :],
+                                    (w, h, ramp.shape[1]))
     else:
-        for col in range(x1, x2):
-            color = (min(max(a[0] + (rate[0] * (col - x1)), 0), 255),
-                     min(max(a[1] + (rate[1] * (col - x1)), 0), 255),
-                     min(max(a[2] + (rate[2] * (col - x1)), 0), 255))
-            fn_line(surface, color, (col, y1), (col, y2))
+        pixels = numpy.broadcast_to(ramp[:, numpy.newaxis, :],
+                                    (w, h, ramp.shape[1]))
+
+    pygame.surfarray.blit_array(surface, pixels[:, :, :3])
+    if ramp.shape[1] == 4:
+        alpha = pygame.surfarray.pixels_alpha(surface)
+        alpha[...] = pixels[:, :, 3]
+        del alpha   # unlock the surface
 
 
 def fillrect(surface, color, rect, vertical=True):
@@ -72,3 +180,216 @@ def fillrect(surface, color, rect, vertical=True):
                       rect=rect, vertical=vertical)
     else:
         surface.fill(color, rect)
+
+
+def render_text(font, text, color, antialias=True):
+    """Render a line of text with `font`, reusing earlier renderings.
+
+    The returned surface may be shared; do not draw on it.
+    """
+    key = (font, text, tuple(color), antialias)
+    surface = text_cache.get(key)
+    if surface is None:
+        surface = font.render(text, antialias, color)
+        text_cache.put(key, surface, cache.surface_bytes(surface))
+    return surface
+
+
+def render_text_shadow(font, text, color, shadow_color, antialias=True):
+    """Render the shadow, in `shadow_color`, of text rendered in `color`.
+
+    The result looks the same as `render_text(font, text, shadow_color)`,
+    but is made by tinting the coverage of the text rendered in `color`,
+    which is usually already cached, instead of rasterizing the text
+    again. The returned surface may be shared; do not draw on it.
+    """
+    key = (font, text, tuple(shadow_color), antialias)
+    shadow = text_cache.get(key)
+    if shadow is None:
+        text_surface = render_text(font, text, color, antialias)
+        if (tint_text_shadows and
+                text_surface.get_flags() & pygame.SRCALPHA):
+            shadow = tint(text_surface, shadow_color)
+        else:   # no per-pixel alpha to tint (e.g. not antialiased)
+            shadow = font.render(text, antialias, shadow_color)
+        text_cache.put(key, shadow, cache.surface_bytes(shadow))
+    return shadow
+
+
+class GlyphAtlas(object):
+    """The glyphs of a font, rendered once (antialiased) in one color to
+    one surface.
+
+    Text made of the atlas' characters (resource.metrics_chars) is laid
+    out as a run of glyphs and drawn as one blit per glyph, so changing
+    the text renders nothing and allocates no surfaces. Glyphs are placed
+    using the font's advances and kerning, the way font.render places
+    them; only pixels where glyphs overlap may differ slightly.
+
+    Atlases of a font in different colors have the same layout, so a run
+    laid out with one can be drawn with another.
+
+    """
+
+    max_width = 512
+
+    def __init__(self, font, color, chars=resource.metrics_chars):
+        self.height = font.size(chars)[1]
+
+        # Crop each glyph to its ink and pack the glyphs in rows.
+        self.glyphs = {}    # char -> (atlas rect, offset) or None if blank
+        placed = []
+        x = y = row_h = 0
+        for char in chars:
+            try:
+                glyph = font.render(char, True, color)
+            except pygame.error:    # zero width, e.g. a soft hyphen
+                self.glyphs[char] = None
+                continue
+            ink = glyph.get_bounding_rect()
+            if ink.w == 0 or ink.h == 0:
+                self.glyphs[char] = None
+                continue
+            if x + ink.w > self.max_width:
+                x, y, row_h = 0, y + row_h, 0
+            rect = pygame.Rect(x, y, ink.w, ink.h)
+            self.glyphs[char] = (rect, ink.topleft)
+            placed.append((glyph, rect.topleft, ink))
+            x += ink.w
+            row_h = max(row_h, ink.h)
+
+        self.surface = pygame.Surface((self.max_width, max(1, y + row_h)),
+                                      pygame.SRCALPHA, 32)
+        self.surface.fill((0, 0, 0, 0))
+        for glyph, dest, ink in placed:
+            self.surface.blit(glyph, dest, ink,
+                              special_flags=pygame.BLEND_RGBA_MAX)
+
+    def layout(self, font, text):
+        """Lay out a line of text as (width, glyphs) for `draw`, or None if
+        the atlas or the font's metrics lack some character of the text
+        (the metrics leave out zero-width characters such as the soft
+        hyphen)."""
+        glyphs = self.glyphs
+        metrics = resource.get_font_metrics(font)
+        index = metrics.index
+        for char in text:
+            if char not in index:
+                return None
+        run = []
+        x = 0
+        last = len(text) - 1
+        for i, char in enumerate(text):
+            try:
+                glyph = glyphs[char]
+            except KeyError:
+                return None
+            if glyph is not None:
+                rect, (dx, dy) = glyph
+                run.append((x + dx, dy, rect))
+            if i < last:
+                x += (metrics.advances[metrics.index[char]] +
+                      metrics.kerning(font, char, text[i + 1]))
+        if text:
+            x += metrics.widths[metrics.index[text[-1]]]
+        return x, run
+
+    def draw(self, surface, run, pos):
+        x, y = pos
+        atlas = self.surface
+        if hasattr(surface, 'blits'):
+            surface.blits([(atlas, (x + dx, y + dy), rect)
+                           for dx, dy, rect in run], False)
+        else:
+            for dx, dy, rect in run:
+                surface.blit(atlas, (x + dx, y + dy), rect)
+
+
+def get_glyph_atlas(font, color):
+    key = (font, tuple(color))
+    atlas = glyph_atlas_cache.get(key)
+    if atlas is None:
+        atlas = GlyphAtlas(font, color)
+        glyph_atlas_cache.put(key, atlas, cache.surface_bytes(atlas.surface))
+    return atlas
+
+
+def tint(surface, color):
+    """A copy of a per-pixel alpha surface with the color of every pixel
+    replaced by `color`, keeping each pixel's alpha."""
+    if accelerated:
+        return _tint_surfarray(surface, color)
+    tinted = surface.copy()
+    tinted.fill((0, 0, 0, 255), special_flags=pygame.BLEND_RGBA_MULT)
+    tinted.fill(tuple(color[:3]) + (0,), special_flags=pygame.BLEND_RGBA_ADD)
+    return tinted
+
+
+def _tint_surfarray(surface, color):
+    import pygame.surfarray
+
+    tinted = pygame.Surface(surface.get_size(), pygame.SRCALPHA, 32)
+    tinted.fill(tuple(color[:3]) + (255,))
+    alpha = pygame.surfarray.pixels_alpha(tinted)
+    alpha[...] = pygame.surfarray.pixels_alpha(surface)
+    del alpha   # unlock the surface
+    return tinted
+
+
+def nine_slice(image, size, border):
+    """Scale `image` to `size`, keeping its `border` pixel wide edges.
+
+    The corners are copied as-is, the edges are stretched along their
+    length and the middle is stretched both ways.
+    """
+
+    w, h = size
+    iw, ih = image.get_size()
+    assert 2 * border < min(iw, ih) and 2 * border <= min(w, h)
+
+    # (source offset, source length, destination offset, destination length)
+    cols = [(0, border, 0, border),
+            (border, iw - 2 * border, border, w - 2 * border),
+            (iw - border, border, w - border, border)]
+    rows = [(0, border, 0, border),
+            (border, ih - 2 * border, border, h - 2 * border),
+            (ih - border, border, h - border, border)]
+
+    surface = pygame.Surface(size, pygame.SRCALPHA, 32)
+    for sy, sh, dy, dh in rows:
+        for sx, sw, dx, dw in cols:
+            if sw == 0 or sh == 0 or dw == 0 or dh == 0:
+                continue
+            piece = image.subsurface((sx, sy, sw, sh))
+            if (sw, sh) != (dw, dh):
+                piece = pygame.transform.scale(piece, (dw, dh))
+            surface.blit(piece, (dx, dy))
+    return surface
+
+
+def get_shadow(size, blur):
+    """A drop shadow image of the given size.
+
+    `blur` is how far the shadow's soft edges reach in from each side;
+    views use their theme's shadow_size. The packaged 'shadow' image is
+    scaled once per blur and nine-sliced to each requested size, so the
+    edges look the same on views of every size. Shadows are cached in
+    `shadow_cache` and shared by views of the same size.
+    """
+
+    size = tuple(size)
+    # Small sizes cannot fit two full edges.
+    blur = max(0, min(blur, (size[0] - 1) // 2, (size[1] - 1) // 2))
+
+    key = (size, blur)
+    shadow = shadow_cache.get(key)
+    if shadow is None:
+        source_key = ('source', blur)
+        source = shadow_cache.get(source_key)
+        if source is None:
+            image = resource.get_image('shadow')
+            source = resource.scale_image(image, (blur * 2 + 1, blur * 2 + 1))
+            shadow_cache.put(source_key, source, cache.surface_bytes(source))
+        shadow = nine_slice(source, size, blur)
+        shadow_cache.put(key, shadow, cache.surface_bytes(shadow))
+    return shadow
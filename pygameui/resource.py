@@ -1,86 +1,515 @@
+import os
 import pygame
-import pkg_resources
 
 import weakref
 import logging
 
+from . import cache
+from . import callback
 
-logger = logging.getLogger(__name__)
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    from importlib import resources as package_resources
+    package_resources.files
+except (ImportError, AttributeError):   # Python < 3.9
+    package_resources = None
 
+try:
+    import queue
+except ImportError:     # Python 2
+    import Queue as queue
 
-font_cache = weakref.WeakValueDictionary()
-image_cache = weakref.WeakValueDictionary()
-sound_cache = weakref.WeakValueDictionary()
+try:
+    from concurrent import futures
+except ImportError:     # Python 2 without the futures backport
+    futures = None
+
+try:
+    unichr
+except NameError:   # Python 3
+    unichr = chr
+
+
+logger = logging.getLogger(__name__)
 
 
 package_name = 'pygameui'
 
 
+# Assets: fonts, images and sounds.
+#
+# Assets are found by name in the directories of `search_paths`, in order;
+# each directory may have fonts/, images/ and sounds/ subdirectories like
+# pygameui's own resources directory, which is searched last. Loaded assets
+# are kept in `asset_cache` until its byte budget forces them out.
+#
+# Images are looked up in the texture atlases of `atlases` (see the atlas
+# module) before the search paths.
+
+if package_resources is not None:
+    resources_path = str(package_resources.files(package_name) / 'resources')
+else:
+    import pkg_resources
+    resources_path = pkg_resources.resource_filename(package_name, 'resources')
+
+search_paths = [resources_path]
+
+asset_types = {     # type -> (subdirectory, default file extension)
+    'font': ('fonts', '.ttf'),
+    'image': ('images', '.png'),
+    'sound': ('sounds', '.ogg'),
+}
+
+atlases = []
+
+asset_stats = dict((asset_type, dict(hits=0, misses=0, evictions=0))
+                   for asset_type in asset_types)
+
+
+def _count_eviction(key, asset):
+    asset_stats[key[0]]['evictions'] += 1
+
+
+# Loaded assets keyed by (type, name) or, for fonts and scaled images,
+# (type, name, size).
+asset_cache = cache.LRUCache(64 * 1024 * 1024, on_evict=_count_eviction)
+
+
+def add_search_path(path):
+    """Look for assets in `path` before the directories searched so far."""
+    search_paths.insert(0, path)
+
+
+def add_atlas(atlas):
+    """Look for images in `atlas` before the atlases added so far."""
+    atlases.insert(0, atlas)
+
+
+def _atlas_image(name):
+    for atlas in atlases:
+        if name in atlas:
+            return atlas.image(name)
+    return None
+
+
+def find_asset(asset_type, name):
+    """The path of the named asset in the search paths, or None.
+
+    `name` is a file name in the type's subdirectory, without the
+    extension if it is the type's default one (e.g. 'star' for
+    images/star.png).
+    """
+    subdir, extension = asset_types[asset_type]
+    if not os.path.splitext(name)[1]:
+        name += extension
+    for directory in search_paths:
+        path = os.path.join(directory, subdir, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _cached_asset(key):
+    asset = asset_cache.get(key)
+    stats = asset_stats[key[0]]
+    if asset is None:
+        stats['misses'] += 1
+    else:
+        stats['hits'] += 1
+    return asset
+
+
+def asset_cache_stats():
+    """Hit, miss and eviction counts per asset type, and the cache's
+    totals (under 'all')."""
+    result = dict((asset_type, dict(counts))
+                  for asset_type, counts in asset_stats.items())
+    result['all'] = asset_cache.stats()
+    return result
+
+
 def get_font(size, use_bold=False):
-    filename = 'regular'
-    if use_bold:
-        filename = 'bold'
-    key = '%s:%d' % (filename, size)
-    try:
-        font = font_cache[key]
-    except KeyError:
-        path = 'resources/fonts/%s.ttf' % filename
-        path = pkg_resources.resource_filename(package_name, path)
+    name = 'bold' if use_bold else 'regular'
+    key = ('font', name, size)
+    font = _cached_asset(key)
+    if font is None:
+        path = find_asset('font', name)
         try:
+            if path is None:
+                raise pygame.error('not found in %s' % search_paths)
             logger.debug('loading font %s' % path)
             font = pygame.font.Font(path, size)
+            nbytes = os.path.getsize(path)
         except pygame.error as e:
-            logger.warning('failed to load font: %s: %s' % (path, e))
+            logger.warning('failed to load font: %s: %s' % (name, e))
             backup_fonts = 'helvetica,arial'
             font = pygame.font.SysFont(backup_fonts, size, use_bold)
-        else:
-            font_cache[key] = font
+            nbytes = 0
+        asset_cache.put(key, font, nbytes)
     return font
 
 
-# TODO update this to support multiple search paths
+def get_image(name, size=None):
+    """The named image, or None if it cannot be loaded.
 
+    If `size` is given, the image is scaled to that size; scaled images
+    are cached too.
+    """
+    if size is not None:
+        img = get_image(name)
+        if img is None or img.get_size() == tuple(size):
+            return img
+        key = ('image', name, tuple(size))
+        scaled = _cached_asset(key)
+        if scaled is None:
+            scaled = scale_image(img, size)
+            asset_cache.put(key, scaled, cache.surface_bytes(scaled))
+        return scaled
 
-def get_image(name):
-    try:
-        img = image_cache[name]
-    except KeyError:
-        path = 'resources/images/%s.png' % name
-        path = pkg_resources.resource_filename(package_name, path)
-        try:
-            logger.debug('loading image %s' % path)
-            img = pygame.image.load(path)
-        except pygame.error as e:
-            logger.warning('failed to load image: %s: %s' % (path, e))
-            img = None
-        else:
-            img = img.convert_alpha()
-            image_cache[path] = img
+    img = _atlas_image(name)
+    if img is not None:
+        return img
+
+    key = ('image', name)
+    img = _cached_asset(key)
+    if img is None:
+        img = _load_image(name)
+        if img is not None:
+            asset_cache.put(key, img, cache.surface_bytes(img))
     return img
 
 
+def _load_image(name):
+    path = find_asset('image', name)
+    if path is None:
+        logger.warning('failed to load image: %s: not found in %s' %
+                       (name, search_paths))
+        return None
+    try:
+        logger.debug('loading image %s' % path)
+        img = pygame.image.load(path)
+    except pygame.error as e:
+        logger.warning('failed to load image: %s: %s' % (path, e))
+        return None
+    return img.convert_alpha()
+
+
 def scale_image(image, size):
     return pygame.transform.smoothscale(image, size)
 
 
-def get_sound(name):
-    class NoSound:
-        def play(self):
-            pass
+# Asynchronous image loading.
+#
+# load_image_async decodes (and scales) images on worker threads so that
+# large images do not stall frames. Loaded images are handed over on the
+# main thread by finish_loading, which the run loop calls every frame.
+# Without concurrent.futures images are loaded synchronously, but still
+# handed over by finish_loading.
+
+loader_threads = 4
+
+# Posted when an image has been loaded, to wake up an idle run loop.
+try:
+    IMAGE_LOADED = pygame.event.custom_type()
+except AttributeError:  # pygame 1.x
+    IMAGE_LOADED = pygame.USEREVENT
+
+_loader = None
+_loading = {}               # cache key -> ImageHandle
+_loaded = queue.Queue()     # (ImageHandle, image or None)
+
+
+class ImageHandle(object):
+    """An image that is being loaded in the background.
+
+    `image` is a transparent placeholder, of the requested size (or 1x1
+    if none was given), until the image is loaded; then `image` is the
+    loaded image, `loaded` is True and `on_loaded(handle)` is signalled.
+    If the image cannot be loaded `failed` is set instead and `image`
+    stays the placeholder.
+
+    """
+
+    def __init__(self, name, size=None, image=None):
+        self.name = name
+        self.size = size
+        self.loaded = image is not None
+        self.failed = False
+        if image is None:
+            image = pygame.Surface(size or (1, 1), pygame.SRCALPHA, 32)
+            image.fill((0, 0, 0, 0))
+        self.image = image
+        self.on_loaded = callback.Signal()
+
 
+def load_image_async(name, size=None):
+    """Start loading the named image, scaled to `size` if given.
+
+    Returns an ImageHandle right away. Images already cached or in an
+    atlas are not loaded again; their handle is loaded from the start.
+    """
+    if _atlas_image(name) is not None:
+        return ImageHandle(name, size, get_image(name, size))
+
+    if size is not None:
+        size = tuple(size)
+        key = ('image', name, size)
+    else:
+        key = ('image', name)
+
+    img = asset_cache.get(key)
+    if img is None and size is not None:
+        original = asset_cache.get(('image', name))
+        if original is not None and original.get_size() == size:
+            img = original
+    if img is not None:
+        asset_stats['image']['hits'] += 1
+        return ImageHandle(name, size, img)
+
+    handle = _loading.get(key)
+    if handle is None:
+        asset_stats['image']['misses'] += 1
+        handle = _loading[key] = ImageHandle(name, size)
+        path = find_asset('image', name)
+        if path is None:
+            logger.warning('failed to load image: %s: not found in %s' %
+                           (name, search_paths))
+            _loaded.put((handle, None))
+        elif futures is None:
+            _decode_image(handle, path)
+        else:
+            global _loader
+            if _loader is None:
+                _loader = futures.ThreadPoolExecutor(loader_threads)
+            _loader.submit(_decode_image, handle, path)
+    return handle
+
+
+def _decode_image(handle, path):
+    """Runs on a loader thread. Always hands the handle over, with None
+    as the image if it could not be loaded, so that it never stays
+    loading."""
+    img = None
+    try:
+        img = pygame.image.load(path)
+        if handle.size is not None and img.get_size() != handle.size:
+            if img.get_bitsize() < 24:  # smoothscale needs 24 or 32 bits
+                converted = pygame.Surface(img.get_size(), pygame.SRCALPHA, 32)
+                converted.fill((0, 0, 0, 0))
+                converted.blit(img, (0, 0))
+                img = converted
+            img = scale_image(img, handle.size)
+    except Exception as e:  # the executor would swallow it
+        logger.warning('failed to load image: %s: %s' % (path, e))
+        img = None
+    finally:
+        _loaded.put((handle, img))
+    try:
+        pygame.event.post(pygame.event.Event(IMAGE_LOADED))
+    except pygame.error:    # no display (yet); finish_loading still runs
+        pass
+
+
+def finish_loading():
+    """Hand over the images loaded since the last call: cache them and
+    signal their handles. Must be called on the main thread."""
+    while True:
+        try:
+            handle, img = _loaded.get_nowait()
+        except queue.Empty:
+            return
+        if handle.size is None:
+            key = ('image', handle.name)
+        else:
+            key = ('image', handle.name, handle.size)
+        _loading.pop(key, None)
+        if img is None:
+            handle.failed = True
+            continue
+        img = img.convert_alpha()
+        asset_cache.put(key, img, cache.surface_bytes(img))
+        handle.image = img
+        handle.loaded = True
+        handle.on_loaded(handle)
+
+
+class NoSound(object):
+    def play(self):
+        pass
+
+
+def get_sound(name):
     if not pygame.mixer or not pygame.mixer.get_init():
         return NoSound()
 
-    try:
-        sound = sound_cache[name]
-    except KeyError:
-        path = 'resources/sounds/%s.ogg' % name
-        path = pkg_resources.resource_filename(package_name, path)
+    key = ('sound', name)
+    sound = _cached_asset(key)
+    if sound is None:
+        path = find_asset('sound', name)
         try:
+            if path is None:
+                raise pygame.error('not found in %s' % search_paths)
             sound = pygame.mixer.Sound(path)
         except pygame.error as e:
-            logger.warning('failed to load sound: %s: %s' % (path, e))
-            sound = NoSound()
-        else:
-            sound_cache[path] = sound
+            logger.warning('failed to load sound: %s: %s' % (name, e))
+            return NoSound()
+        frequency, sample_format, channels = pygame.mixer.get_init()
+        nbytes = int(sound.get_length() * frequency * channels *
+                     abs(sample_format) // 8)
+        asset_cache.put(key, sound, nbytes)
     return sound
+
+
+# Text measurement.
+#
+# Each font gets a table of the advance widths of the characters below,
+# built the first time the font measures text. Many strings are then
+# measured at once with NumPy (see measure_many) instead of one at a time
+# with font.size. Other characters are measured by SDL_ttf.
+
+metrics_chars = u''.join(unichr(c) for c in
+                         list(range(32, 127)) + list(range(160, 256)))
+
+font_metrics = weakref.WeakKeyDictionary()
+
+# Batches smaller than this are measured with font.size; the setup cost
+# of a vectorized measurement only pays off for more strings.
+min_vectorized = 16
+
+
+class FontMetrics(object):
+    """Character metrics of a font, for measuring strings in bulk.
+
+    The width of a string, as reported by font.size, is the sum of the
+    advances of all but its last character, plus the width of the last
+    character on its own, plus a kerning adjustment for each pair of
+    adjacent characters. Advances and widths are tabulated up front for
+    `metrics_chars`; pair adjustments are measured the first time a pair
+    is seen.
+
+    The widths of measured strings are also remembered, up to
+    `max_measured` of them, so that measuring the same words again (e.g.
+    when rewrapping text) costs a dictionary lookup.
+
+    """
+
+    max_measured = 4096     # the memo is reset when full
+
+    def __init__(self, font, chars=metrics_chars):
+        # Characters drawn with no width (the soft hyphen) do not add
+        # their advance to a string either; leave them to font.size.
+        widths = [font.size(char)[0] for char in chars]
+        chars = u''.join(char for char, width in zip(chars, widths)
+                         if width > 0)
+        self.chars = chars
+        self.index = dict((char, i) for i, char in enumerate(chars))
+        self.advances = [metric[4] for metric in font.metrics(chars)]
+        self.widths = [width for width in widths if width > 0]
+        self.measured = {}
+        self._pairs = {}
+        if numpy is not None:
+            self._lookup = numpy.full(max(map(ord, chars)) + 1, -1,
+                                      dtype=numpy.intp)
+            self._lookup[[ord(char) for char in chars]] = range(len(chars))
+            self._advances = numpy.array(self.advances, dtype=numpy.intp)
+            self._widths = numpy.array(self.widths, dtype=numpy.intp)
+            self._kerning = numpy.zeros((len(chars), len(chars)),
+                                        dtype=numpy.intp)
+            self._kerning_known = numpy.zeros((len(chars), len(chars)),
+                                              dtype=bool)
+
+    def measure_many(self, font, strings):
+        measured = self.measured
+        missing = [s for s in set(strings) if s not in measured]
+        if missing:
+            if len(measured) + len(missing) > self.max_measured:
+                measured.clear()
+            if numpy is not None and len(missing) >= min_vectorized:
+                widths = self._measure_vectorized(font, missing)
+            else:
+                widths = [font.size(s)[0] for s in missing]
+            measured.update(zip(missing, widths))
+        return [measured[s] for s in strings]
+
+    def _measure_vectorized(self, font, strings):
+        lengths = numpy.array([len(s) for s in strings], dtype=numpy.intp)
+        ends = numpy.cumsum(lengths)
+        starts = ends - lengths
+
+        code_points = numpy.frombuffer(
+            u''.join(strings).encode('utf-32-le'), dtype='<u4')
+        codes = numpy.full(len(code_points), -1, dtype=numpy.intp)
+        covered = code_points < len(self._lookup)
+        codes[covered] = self._lookup[code_points[covered]]
+
+        # Adjacent characters of the same string.
+        first, second = codes[:-1], codes[1:]
+        pairs = numpy.ones(len(first), dtype=bool)
+        pairs[ends[(ends > 0) & (ends < len(codes))] - 1] = False
+        pairs &= (first >= 0) & (second >= 0)
+        self._learn_kerning(font, first[pairs], second[pairs])
+        kerning = numpy.zeros(len(codes), dtype=numpy.intp)
+        kerning[:-1][pairs] = self._kerning[first[pairs], second[pairs]]
+
+        # Per character: its advance, or its width if it ends its string.
+        sizes = self._advances[codes] + kerning
+        last = ends - 1
+        sizes[last[lengths > 0]] = self._widths[codes[last[lengths > 0]]]
+        totals = numpy.concatenate(([0], numpy.cumsum(sizes)))
+        widths = (totals[ends] - totals[starts]).tolist()
+
+        # Strings with characters outside the table; and empty strings.
+        uncovered = numpy.concatenate(([0], numpy.cumsum(codes < 0)))
+        for i in numpy.flatnonzero(uncovered[ends] != uncovered[starts]):
+            widths[i] = font.size(strings[i])[0]
+        for i in numpy.flatnonzero(lengths == 0):
+            widths[i] = 0
+        return widths
+
+    def kerning(self, font, a, b):
+        """The kerning adjustment between two characters of the table."""
+        pair = a + b
+        try:
+            return self._pairs[pair]
+        except KeyError:
+            adjustment = (font.size(pair)[0] - self.advances[self.index[a]] -
+                          self.widths[self.index[b]])
+            self._pairs[pair] = adjustment
+            return adjustment
+
+    def _learn_kerning(self, font, first, second):
+        unknown = ~self._kerning_known[first, second]
+        if not unknown.any():
+            return
+        pairs = set(zip(first[unknown].tolist(), second[unknown].tolist()))
+        for a, b in pairs:
+            width = font.size(self.chars[a] + self.chars[b])[0]
+            self._kerning[a, b] = width - self.advances[a] - self.widths[b]
+            self._kerning_known[a, b] = True
+
+
+def get_font_metrics(font):
+    try:
+        return font_metrics[font]
+    except KeyError:
+        metrics = font_metrics[font] = FontMetrics(font)
+        return metrics
+
+
+def measure_many(font, strings):
+    """The widths of `strings` set in `font`, in pixels.
+
+    Gives the same widths as measuring each string with font.size, but
+    is much faster for long lists of strings, and strings measured
+    before are not measured again.
+    """
+    return get_font_metrics(font).measure_many(font, strings)
+
+
+def measure(font, text):
+    """The width of `text` set in `font`, in pixels."""
+    return get_font_metrics(font).measure_many(font, [text])[0]
@@ -45,12 +45,15 @@ class SliderView(view.View):
     Signals
     on_value_changed(sliderview, value)
 
+    on_value_changed is queued: it is delivered once a frame, with the
+    last value, however often the value changes during a drag.
+
     """
 
     def __init__(self, frame, direction, low, high, show_thumb=True):
         view.View.__init__(self, frame)
 
-        self.on_value_changed = callback.Signal()
+        self.on_value_changed = callback.Signal(queued=True)
 
         self.direction = direction
         self.low = min(low, high)
@@ -99,6 +102,7 @@ class SliderView(view.View):
 
         self._value = max(self.low, min(self.high, val))
         self.track.value_percent = (val - self.low) / (self.high - self.low)
+        self.track.set_needs_display()
 
         if update_thumb:
             self._update_thumb()
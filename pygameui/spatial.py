@@ -0,0 +1,85 @@
+"""Spatial indexing of child views for fast hit testing.
+
+See View.set_hit_grid.
+
+"""
+
+
+class GridIndex(object):
+    """A uniform grid over the frames of a view's children.
+
+    Each child is listed in every grid cell its frame overlaps, so the
+    children under a point are found by looking at a single cell. The
+    index also tracks the stacking order of the children so that
+    candidates come back front to back, as View.hit expects.
+
+    """
+
+    def __init__(self, cell_size=64):
+        assert cell_size > 0
+        self.cell_size = cell_size
+        self._cells = {}        # (col, row) -> set of views
+        self._view_cells = {}   # view -> (col range, row range)
+        self._z = {}            # view -> stacking order; larger is in front
+        self._next_z = 0
+
+    def __len__(self):
+        return len(self._z)
+
+    def add(self, view):
+        """Index `view` in front of every view added before it."""
+        self._z[view] = self._next_z
+        self._next_z += 1
+        self._place(view)
+
+    def remove(self, view):
+        self._unplace(view)
+        self._z.pop(view, None)
+
+    def update(self, view):
+        """Reindex `view` after its frame changed."""
+        if view in self._z and self._cell_span(view.frame) != self._view_cells.get(view):
+            self._unplace(view)
+            self._place(view)
+
+    def swap(self, a, b):
+        """Swap the stacking order of two indexed views."""
+        self._z[a], self._z[b] = self._z[b], self._z[a]
+
+    def views_at(self, point):
+        """The indexed views whose cell contains `point`, front to back.
+
+        Candidates are not checked against the point; View.hit does that.
+        """
+        cell = (int(point[0] // self.cell_size), int(point[1] // self.cell_size))
+        views = self._cells.get(cell)
+        if not views:
+            return []
+        return sorted(views, key=self._z.__getitem__, reverse=True)
+
+    def _cell_span(self, rect):
+        size = self.cell_size
+        cols = (rect.left // size, (rect.right - 1) // size + 1)
+        rows = (rect.top // size, (rect.bottom - 1) // size + 1)
+        return cols, rows
+
+    def _place(self, view):
+        span = self._cell_span(view.frame)
+        self._view_cells[view] = span
+        (col0, col1), (row0, row1) = span
+        for col in range(col0, col1):
+            for row in range(row0, row1):
+                self._cells.setdefault((col, row), set()).add(view)
+
+    def _unplace(self, view):
+        span = self._view_cells.pop(view, None)
+        if span is None:
+            return
+        (col0, col1), (row0, row1) = span
+        for col in range(col0, col1):
+            for row in range(row0, row1):
+                views = self._cells.get((col, row))
+                if views is not None:
+                    views.discard(view)
+                    if not views:
+                        del self._cells[(col, row)]
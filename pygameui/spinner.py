@@ -1,5 +1,4 @@
 from . import flipbook
-from . import resource
 
 
 class SpinnerView(flipbook.FlipbookView):
@@ -7,5 +6,4 @@ class SpinnerView(flipbook.FlipbookView):
 
     def __init__(self, frame):
         frame.size = (SpinnerView.size, SpinnerView.size)
-        image = resource.get_image('spinner')
-        flipbook.FlipbookView.__init__(self, frame, image)
+        flipbook.FlipbookView.__init__(self, frame, 'spinner')
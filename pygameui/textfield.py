@@ -3,6 +3,7 @@ import pygame
 from . import view
 from . import label
 from . import callback
+from . import resource
 
 
 class TextField(view.View):
@@ -20,7 +21,8 @@ class TextField(view.View):
     def __init__(self, frame, text='', placeholder=''):
         view.View.__init__(self, frame)
 
-        self.text = text or ''
+        self._text = text or ''
+        self._needs_fit = False
         self.placeholder = placeholder
 
         self.label = label.Label(pygame.Rect((0, 0), frame.size),
@@ -35,6 +37,18 @@ class TextField(view.View):
         self.on_return = callback.Signal()
         self.on_text_change = callback.Signal()
 
+        self._cursor_drawn = False
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, text):
+        self._text = text
+        self._needs_fit = True
+        self.set_needs_display()
+
     def layout(self):
         self.label.topleft = self.padding
         r_before = self.label.frame.right
@@ -42,6 +56,7 @@ class TextField(view.View):
         self.label.frame.h = self.frame.h - self.padding[1] * 2
         self.label.frame.right = r_before
         self._update_text()
+        self.label.layout()
         view.View.layout(self)
 
     def key_down(self, key, code):
@@ -63,6 +78,21 @@ class TextField(view.View):
         if self.max_len:
             self.text = self.text[0:self.max_len]
 
+    def _apply_style(self):
+        relayout = view.View._apply_style(self)
+        self._update_text()     # the label takes the text field's colors
+        return relayout
+
+    def layout_if_needed(self):
+        if self._needs_fit and not self._hidden:
+            self._fit_label()
+        view.View.layout_if_needed(self)
+
+    def _fit_label(self):
+        """Size the label to the text, keeping the end of the text (where
+        the cursor is) in view."""
+
+        self._needs_fit = False
         self._update_text()
         self.label.shrink_wrap()
         self.label.layout()
@@ -72,6 +102,8 @@ class TextField(view.View):
         else:
             self.label.frame.left = self.padding[0]
 
+        self.set_needs_display()
+
     def _update_text(self):
         if len(self.text) == 0 and self.placeholder is not None and not self.has_focus():
             self.label.text_color = self.placeholder_text_color
@@ -82,14 +114,34 @@ class TextField(view.View):
         elif self.secure:
             self.label.text = '*' * len(self.text)
 
+    def _cursor_visible(self):
+        if not self.has_focus():
+            return False
+        if not self.blink_cursor:
+            return True
+        return pygame.time.get_ticks() // self.cursor_blink_duration % 2 == 0
+
+    def update(self, dt):
+        view.View.update(self, dt)
+        if self._cursor_visible() != self._cursor_drawn:
+            self.set_needs_display()
+        if self.has_focus() and self.blink_cursor:
+            duration = self.cursor_blink_duration
+            self.request_update(
+                (duration - pygame.time.get_ticks() % duration) / 1000.0)
+
     def draw(self):
-        if not view.View.draw(self) or not self.has_focus():
+        if self._needs_fit:
+            self._fit_label()
+
+        if not view.View.draw(self):
             return False
 
-        if not self.blink_cursor or pygame.time.get_ticks() / self.cursor_blink_duration % 2 == 0:
-            size = self.label.font.size(self.text)
+        self._cursor_drawn = self._cursor_visible()
+        if self._cursor_drawn:
+            text_width = resource.measure(self.label.font, self.text)
             rect = pygame.Rect(
-                self.label.frame.left + self.label.padding[0] + size[0],
+                self.label.frame.left + self.label.padding[0] + text_width,
                 self.label.frame.bottom - self.label.padding[1],
                 10, 2)
             pygame.draw.rect(self.surface, self.text_color, rect)
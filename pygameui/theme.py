@@ -1,8 +1,20 @@
 from itertools import chain
 
+from . import render
 from . import resource
+from . import view
 from .colors import *
-from .view import current as current_view
+
+
+class LazyFont(object):
+    """A font of resource.get_font that is loaded when first styled."""
+
+    def __init__(self, size, use_bold=False):
+        self.size = size
+        self.use_bold = use_bold
+
+    def resolve(self):
+        return resource.get_font(self.size, self.use_bold)
 
 
 class Theme(object):
@@ -57,6 +69,9 @@ class Theme(object):
         border_color: (0, 0, 0)         from View
         text_color: (128, 0, 0)         from Button
 
+    Fonts may be given as a `LazyFont`; the font is then loaded the first
+    time a view is stylized with it, not when the theme is built.
+
     Note that the 'key' is really a 'key path' which would allow you
     to style views contained in other views. For instance, an AlertView
     has a `title_label` which is a Label.  You may wish to style
@@ -68,6 +83,7 @@ class Theme(object):
 
     def __init__(self):
         self._styles = {}
+        self._resolved = {}     # (class, state, base_name) -> style dict
 
     def set(self, class_name, state, key, value):
         """Set a single style value for a view class and state.
@@ -94,8 +110,10 @@ class Theme(object):
             thereof for a linear gradient.
 
         """
-        self._styles.setdefault(class_name, {}).setdefault(state, {})
-        self._styles[class_name][state][key] = value
+        styles = self._styles.setdefault(class_name, {}).setdefault(state, {})
+        if key not in styles or styles[key] != value:
+            styles[key] = value
+            self._forget(class_name)
 
     def set_for_class(self, class_name, params):
         """
@@ -106,10 +124,8 @@ class Theme(object):
         :param params: list of tuples, ('focused', 'background_color', black)
         :return: None
         """
-        self._styles.setdefault(class_name, {})
         for state, key, value in sorted(params, key=lambda x: x[0]):
-            self._styles[class_name].setdefault(state, {})
-            self._styles[class_name][state][key] = value
+            self.set(class_name, state, key, value)
 
     def set_for_theme(self, params):
         """
@@ -129,12 +145,22 @@ class Theme(object):
         for class_name, args in params:
             self.set_for_class(class_name, args)
 
+    def _forget(self, class_name):
+        """Drop the resolved styles of the classes that inherit styles
+        from `class_name`."""
+        for resolved_key in list(self._resolved):
+            klass = resolved_key[0]
+            if any(k.__name__ == class_name for k in klass.__mro__):
+                del self._resolved[resolved_key]
+
     def get_dict_for_class(self, class_name, state=None, base_name='View'):
         """The style dict for a given class and state.
 
         This collects the style attributes from parent classes
         and the class of the given object and gives precedence
-        to values thereof to the children.
+        to values thereof to the children. All classes in the
+        method resolution order up to `base_name` are consulted,
+        so styles of mixin classes apply too.
 
         The state attribute of the view instance is taken as
         the current state if state is None.
@@ -144,18 +170,24 @@ class Theme(object):
         style definitions, giving precedence to the non-'normal'
         style definitions.
 
+        The dict is resolved once per class and state, and shared
+        until the theme changes; do not modify it.
+
         """
-        classes = []
-        klass = class_name
+        if state is None:
+            state = 'normal'
 
-        while True:
+        resolved_key = (class_name, state, base_name)
+        try:
+            return self._resolved[resolved_key]
+        except KeyError:
+            pass
+
+        classes = []
+        for klass in class_name.__mro__:
             classes.append(klass)
             if klass.__name__ == base_name:
                 break
-            klass = klass.__bases__[0]
-
-        if state is None:
-            state = 'normal'
 
         style = {}
 
@@ -179,6 +211,11 @@ class Theme(object):
             style = dict(chain(state_styles.items(),
                                style.items()))
 
+        for key, value in style.items():
+            if isinstance(value, LazyFont):
+                style[key] = value.resolve()
+
+        self._resolved[resolved_key] = style
         return style
 
     def get_dict(self, obj, state=None, base_name='View'):
@@ -204,17 +241,25 @@ class Theme(object):
 current = None
 light_theme = Theme()
 dark_theme = Theme()
+dracula_theme = Theme()
 
 
 def use_theme(theme):
     """Make the given theme current.
 
-    There are two included themes: light_theme, dark_theme.
+    There are three included themes: light_theme, dark_theme and
+    dracula_theme (init fills them in).
+
+    The current scene is restyled in one pass (see View.restyle) and the
+    views whose layout changed are laid out once, parents first, before
+    this returns. Other scenes on the stack are restyled when entered.
     """
     global current
     current = theme
-    if current_view is not None:
-        current_view.stylize()
+    render.text_cache.clear()
+    if view.current is not None:
+        view.current.restyle()
+        view.current.layout_if_needed()
 
 
 def init_light_theme():
@@ -261,7 +306,8 @@ def init_light_theme():
                     ('normal', 'text_shadow_offset', (0, 1)),
                     ('normal', 'padding', (6, 6)),
                     ('normal', 'border_widths', None),
-                    ('normal', 'font', resource.get_font(16)),
+                    ('normal', 'font', LazyFont(16)),
+                    ('normal', 'glyph_atlas', False),
                 ]
             ),
             (
@@ -270,7 +316,7 @@ def init_light_theme():
                     ('normal', 'background_color', (color4, color6)),
                     ('focused', 'background_color', color1),
                     ('normal', 'text_color', color8),
-                    ('normal', 'font', resource.get_font(16, use_bold=True)),
+                    ('normal', 'font', LazyFont(16, use_bold=True)),
                     ('normal', 'border_widths', 1),
                     ('normal', 'border_color', color6),
                 ]
@@ -359,7 +405,7 @@ def init_light_theme():
                     ('normal', 'title_label.text_color', color4),
                     ('normal', 'title_label.text_shadow_offset', None),
                     ('normal', 'message_label.background_color', clear_color),
-                    ('normal', 'font', resource.get_font(16)),
+                    ('normal', 'font', LazyFont(16)),
                     ('normal', 'padding', (6, 6)),
                 ]
             ),
@@ -446,7 +492,8 @@ def init_dracula_theme():
                     ('normal', 'text_shadow_offset', (0, 1)),
                     ('normal', 'padding', (6, 6)),
                     ('normal', 'border_widths', None),
-                    ('normal', 'font', resource.get_font(font_size)),
+                    ('normal', 'font', LazyFont(font_size)),
+                    ('normal', 'glyph_atlas', False),
                 ]
             ),
             (
@@ -456,7 +503,7 @@ def init_dracula_theme():
                     ('focused', 'background_color', red_color),
                     ('normal', 'text_color', red_color),
                     ('focused', 'text_color', black_color),
-                    ('normal', 'font', resource.get_font(font_size, use_bold=True)),
+                    ('normal', 'font', LazyFont(font_size, use_bold=True)),
                     ('normal', 'border_widths', 1),
                     ('normal', 'border_color', red_color),
                     ('normal', 'text_shadow_color', red_color),
@@ -549,7 +596,7 @@ def init_dracula_theme():
                     ('normal', 'title_label.border_widths', 1),
                     ('normal', 'title_label.text_shadow_offset', None),
                     ('normal', 'message_label.background_color', clear_color),
-                    ('normal', 'font', resource.get_font(font_size)),
+                    ('normal', 'font', LazyFont(font_size)),
                     ('normal', 'padding', (6, 6)),
                 ]
             ),
@@ -599,7 +646,8 @@ def init_dracula_theme():
 
 def init():
     """Initialize theme support."""
-    light = init_light_theme()
-    dark = init_dark_theme()
+    global light_theme, dark_theme, dracula_theme
+    light_theme = init_light_theme()
     dracula_theme = init_dracula_theme()
+    dark_theme = init_dark_theme() or dracula_theme     # see init_dark_theme
     use_theme(dracula_theme)
@@ -1,15 +1,38 @@
 import pygame
 
+from . import cache
 from . import render
 from . import callback
-from . import resource
 from . import focus
 from . import kvc
+from . import spatial
+from . import theme
 
 
 current = None
 stack = []
 
+# A decorated view whose subtree is composited this many times without
+# changing is cached as a layer; see View.cache_layer.
+layer_after = 2
+
+# Backing surfaces and layers of views; see View.layout.
+surface_pool = cache.SurfacePool(32 * 1024 * 1024)
+
+# The time (pygame.time.get_ticks) by which a view next wants `update` to
+# be called; see View.request_update.
+update_deadline = None
+
+# Set to a RenderStats to count the layouts and text renders of each view
+# per frame.
+render_stats = None
+
+# Style attributes that change the layout of the view they are set on.
+# When stylize changes any of these the view is laid out again; when it
+# changes only others (colors, say) the view that has them is repainted.
+layout_style_keys = set(['padding', 'font', 'margin', 'border_widths',
+                         'shadowed'])
+
 
 def push(scene):
     global current
@@ -33,6 +56,98 @@ def pop():
     focus.set(None)
 
 
+class RenderStats(object):
+    """Counts the layouts and text renders each view does per frame.
+
+    Assign an instance to `view.render_stats` to start counting; the run
+    loop calls `next_frame` after each frame it draws. Views that show
+    more than one of either per frame do redundant work. Counted views
+    are kept alive, so only count while investigating.
+
+    """
+
+    def __init__(self):
+        self.frames = 0
+        self.current = {}   # (view, 'layout' or 'render') -> count
+        self.last = {}      # counts of the last finished frame
+        self.peak = {}      # most counted in any one frame
+
+    def count(self, view, kind):
+        key = (view, kind)
+        self.current[key] = self.current.get(key, 0) + 1
+
+    def next_frame(self):
+        for key, count in self.current.items():
+            if count > self.peak.get(key, 0):
+                self.peak[key] = count
+        self.last, self.current = self.current, {}
+        self.frames += 1
+
+    def report(self, min_count=2):
+        """Lines describing the views that peaked at `min_count` or more
+        layouts or renders in a frame, worst first."""
+        worst = sorted((count, kind, view.__class__.__name__, repr(view))
+                       for (view, kind), count in self.peak.items()
+                       if count >= min_count)
+        return ['%d %ss per frame: %s %s' % entry
+                for entry in reversed(worst)]
+
+
+def _coalesce(rects):
+    """Merge overlapping rects so that no area is repainted twice."""
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        i = 0
+        while i < len(merged):
+            if merged[i].colliderect(rect):
+                rect.union_ip(merged.pop(i))
+                i = 0
+            else:
+                i += 1
+        merged.append(rect)
+    return merged
+
+
+class _Frame(pygame.Rect):
+    """A view's frame; tells the view whenever it moves or resizes."""
+
+    __slots__ = ('view',)
+
+    def __setattr__(self, name, value):
+        if name == 'view':
+            pygame.Rect.__setattr__(self, name, value)
+            return
+        before = tuple(self)
+        pygame.Rect.__setattr__(self, name, value)
+        self._changed(before)
+
+    def _changed(self, before):
+        if tuple(self) != before:
+            view = getattr(self, 'view', None)
+            if view is not None:
+                view._frame_changed()
+
+
+def _notifying(method):
+    """Wrap a Rect method that changes the rect in place to tell the
+    frame's view."""
+    def changing(self, *args, **kwargs):
+        before = tuple(self)
+        method(self, *args, **kwargs)
+        self._changed(before)
+    changing.__name__ = method.__name__
+    changing.__doc__ = method.__doc__
+    return changing
+
+
+for _name in ('move_ip', 'inflate_ip', 'scale_by_ip', 'clamp_ip',
+              'union_ip', 'unionall_ip', 'normalize', 'update',
+              '__setitem__'):
+    if hasattr(pygame.Rect, _name):     # scale_by_ip is pygame 2.3+
+        setattr(_Frame, _name, _notifying(getattr(pygame.Rect, _name)))
+
+
 class View(object):
     """A rectangular portion of the window.
 
@@ -59,62 +174,205 @@ class View(object):
         on_disabled(view)
         on_state_changed(view)
 
+    A view's signals are created when first connected to; emitting one
+    that nothing is connected to does nothing.
+
     All mouse points passed to event methods and to slots are in local
     view coordinates. Use `to_parent` and `to_window` to convert.
 
+    Views are only redrawn when something about them changes. Changes to
+    the frame, `hidden`, `state`, style (via `stylize`) and a relayout
+    invalidate the view automatically; restyling only lays a view out
+    again if one of `layout_style_keys` changed. If you change something
+    else that affects what a view looks like, call `set_needs_display`;
+    if it affects the layout, call `set_needs_layout` to have the view
+    laid out once before it is next drawn, however many changes come
+    first.
+
+    A view's shadow, surface and border may be cached together as a single
+    "layer" that its parent blits as one unit. The layer is rebuilt only
+    when something in the view's subtree is redrawn. Set `cache_layer` to
+    True or False to force this on or off; the default (None) caches
+    decorated views with children once they stop changing.
+
     """
 
+    # Style attributes and those of subclasses live in the instance dict.
+    __slots__ = ('_theme', 'parent', 'children', '_state', '_enabled',
+                 '_hidden', 'draggable', '_dirty', '_needs_display',
+                 '_needs_layout', '_damage', '_composited_rect',
+                 'drawn_rects', 'cache_layer', '_layer', '_clean_composites',
+                 '_hit_grid', '_frame', 'surface', '_backing', 'shadow_image',
+                 '_signals', '__dict__', '__weakref__')
+
+    on_focused = callback.LazySignal('on_focused')
+    on_blurred = callback.LazySignal('on_blurred')
+
+    on_selected = callback.LazySignal('on_selected')
+    on_enabled = callback.LazySignal('on_enabled')
+    on_disabled = callback.LazySignal('on_disabled')
+    on_state_changed = callback.LazySignal('on_state_changed')
+
+    on_mouse_up = callback.LazySignal('on_mouse_up')
+    on_mouse_down = callback.LazySignal('on_mouse_down')
+    on_mouse_motion = callback.LazySignal('on_mouse_motion')
+    on_mouse_drag = callback.LazySignal('on_mouse_drag')
+    on_key_down = callback.LazySignal('on_key_down')
+    on_key_up = callback.LazySignal('on_key_up')
+
+    on_parented = callback.LazySignal('on_parented')
+    on_orphaned = callback.LazySignal('on_orphaned')
+
     def __init__(self, frame=None):
-        from . import theme
-        self.theme = theme.current
-        self.frame = frame
+        self._theme = None
+        self._signals = None    # name -> Signal; see callback.LazySignal
 
         self.parent = None
         self.children = []  # back->front
 
         self._state = 'normal'
         self._enabled = True
-        self.hidden = False
+        self._hidden = False
         self.draggable = False
 
+        self._dirty = True          # self or a descendant needs drawing
+        self._needs_display = True  # all of self needs repainting
+        self._needs_layout = False  # layout before the next draw
+        self._damage = []           # local rects needing repainting
+        self._composited_rect = None  # where the parent last put us
+        self.drawn_rects = []       # local rects repainted by last draw
+
+        self.cache_layer = None
+        self._layer = None
+        self._clean_composites = 0
+
+        self._hit_grid = None
+
+        self.frame = frame
+
+        self.surface = None
+        self._backing = None
         self.shadow_image = None
 
-        self.on_focused = callback.Signal()
-        self.on_blurred = callback.Signal()
+    @property
+    def theme(self):
+        """The theme the view is styled with; the current theme unless
+        one is assigned."""
+        return self._theme or theme.current
+
+    @theme.setter
+    def theme(self, a_theme):
+        self._theme = a_theme
+
+    @property
+    def frame(self):
+        """The view's rect in parent coordinates."""
+        return self._frame
+
+    @frame.setter
+    def frame(self, rect):
+        if rect is not None:
+            rect = _Frame(rect)
+            rect.view = self
+        self._frame = rect
+        self._frame_changed()
+
+    def _frame_changed(self):
+        self._invalidate()
+        parent = self.parent
+        if parent is not None and parent._hit_grid is not None:
+            parent._hit_grid.update(self)
+
+    @property
+    def hidden(self):
+        return self._hidden
 
-        self.on_selected = callback.Signal()
-        self.on_enabled = callback.Signal()
-        self.on_disabled = callback.Signal()
-        self.on_state_changed = callback.Signal()
+    @hidden.setter
+    def hidden(self, yesno):
+        if self._hidden != yesno:
+            self._hidden = yesno
+            self._invalidate()
 
-        self.on_mouse_up = callback.Signal()
-        self.on_mouse_down = callback.Signal()
-        self.on_mouse_motion = callback.Signal()
-        self.on_mouse_drag = callback.Signal()
-        self.on_key_down = callback.Signal()
-        self.on_key_up = callback.Signal()
+    @property
+    def dirty(self):
+        """Whether the view or one of its descendants needs drawing."""
+        return self._dirty
+
+    def set_needs_display(self):
+        """Mark the whole view as needing to be redrawn."""
+        self._needs_display = True
+        self._invalidate()
+
+    def _invalidate_rect(self, rect):
+        """Mark a local rect of this view as needing to be redrawn."""
+        if rect is not None:
+            self._damage.append(rect)
+            self._invalidate()
+
+    def _invalidate(self):
+        curr = self
+        while curr is not None:
+            curr._dirty = True
+            curr = curr.parent
 
-        self.on_parented = callback.Signal()
-        self.on_orphaned = callback.Signal()
+    def _extent(self):
+        """The rect covered by the view and its shadow in its parent."""
+        rect = pygame.Rect(self.frame)
+        if self.shadowed and self.shadow_image is not None:
+            offset = self.theme.shadow_size // 2
+            shadow_rect = self.shadow_image.get_rect()
+            shadow_rect.topleft = (rect.left - offset, rect.top - offset)
+            rect.union_ip(shadow_rect)
+        return rect
 
     def layout(self):
         """Call to have the view layout itself.
 
         Subclasses should invoke this after laying out child
         views and/or updating its own frame.
+
+        The backing surface is kept if the frame size has not changed;
+        otherwise it is swapped for one from `surface_pool`.
         """
+        self._needs_layout = False
+        if render_stats is not None:
+            render_stats.count(self, 'layout')
+        self._backing = surface_pool.resize(self._backing, self.frame.size)
+        self._backing.set_clip(None)
+        self.surface = self._backing
         if self.shadowed:
             shadow_size = self.theme.shadow_size
             shadowed_frame_size = (self.frame.w + shadow_size,
                                    self.frame.h + shadow_size)
-            self.surface = pygame.Surface(
-                shadowed_frame_size, pygame.SRCALPHA, 32)
-            shadow_image = resource.get_image('shadow')
-            self.shadow_image = resource.scale_image(shadow_image,
-                                                     shadowed_frame_size)
+            self.shadow_image = render.get_shadow(shadowed_frame_size,
+                                                  shadow_size)
         else:
-            self.surface = pygame.Surface(self.frame.size, pygame.SRCALPHA, 32)
             self.shadow_image = None
+        self.set_needs_display()
+
+    def set_needs_layout(self):
+        """Have the view laid out before it is next drawn."""
+        self._needs_layout = True
+        self.set_needs_display()
+
+    def _layout_stale(self):
+        """Whether the view must be laid out before it is drawn: it asked
+        to be, or its backing surface does not match its frame."""
+        backing = self._backing
+        return (self._needs_layout or backing is None or
+                backing.get_size() != tuple(self.frame.size))
+
+    def layout_if_needed(self):
+        """Do the work deferred until the next draw (relayouts asked for
+        with `set_needs_layout`, for instance) in this view and its
+        descendants. The run loop calls this before drawing the scene.
+        """
+        if self._hidden or not self._dirty:
+            return
+        if self._layout_stale():
+            self.layout()
+        for child in self.children:
+            child.layout_if_needed()
 
     def size_to_fit(self):
         rect = self.frame
@@ -127,6 +385,18 @@ class View(object):
         for child in self.children:
             child.update(dt)
 
+    def request_update(self, delay=0):
+        """Ask for `update` to be called again within `delay` seconds.
+
+        This only matters when the main loop runs in idle mode (see
+        `pygameui.run`). Views that animate should call this from `update`
+        for as long as they need to be ticked.
+        """
+        global update_deadline
+        due = pygame.time.get_ticks() + int(delay * 1000)
+        if update_deadline is None or due < update_deadline:
+            update_deadline = due
+
     def to_parent(self, point):
         return (point[0] + self.frame.topleft[0],
                 point[1] + self.frame.topleft[1])
@@ -172,6 +442,10 @@ class View(object):
         if self.parent:
             self.parent._child_dragged(self)
 
+    def _child_dragged(self, child):
+        """Called after a draggable child was dragged to a new frame."""
+        pass
+
     def key_down(self, key, code):
         self.on_key_down(self, key, code)
 
@@ -235,66 +509,199 @@ class View(object):
     def stylize(self):
         """Apply theme style attributes to this instance and its children.
 
-        This also causes a relayout to occur so that any changes in padding
-        or other stylistic attributes may be handled.
+        Only attributes whose values differ from the theme's are set. If
+        one of `layout_style_keys` changes (padding, say) the view is laid
+        out again; if only others change, the views they were set on are
+        repainted (see `_style_changed`); if none change, nothing happens.
+        A view that was never laid out gets every attribute and is laid
+        out.
         """
         # do children first in case parent needs to override their style
         for child in self.children:
             child.stylize()
+        if self._apply_style():
+            self.layout()
+
+    def restyle(self):
+        """Like `stylize`, but defer the relayouts to `layout_if_needed`.
+
+        Parents are then laid out before their children, and a child
+        laid out by its parent is not laid out again.
+        """
+        # Styles are applied children first, as in stylize; a walk of an
+        # explicit stack keeps deep trees off the call stack.
+        stack = [self]
+        order = []
+        while stack:
+            view = stack.pop()
+            order.append(view)
+            stack.extend(view.children)
+        for view in reversed(order):
+            if view._apply_style():
+                view.set_needs_layout()
+
+    def _apply_style(self):
+        """Set the theme's style attributes that changed on this view and
+        return whether it needs to be laid out again."""
+        fresh = self._backing is None
+        relayout = fresh
         style = self.theme.get_dict(self)
         for key, val in style.items():
-            kvc.set_value_for_keypath(self, key, val)
-        self.layout()
+            if not fresh and kvc.getter(key)(self) == val:
+                continue
+            kvc.setter(key)(self, val)
+            path, _, name = key.rpartition('.')
+            if name in layout_style_keys:
+                relayout = True
+                continue
+            target = kvc.getter(path)(self) if path else self
+            if isinstance(target, View):
+                target._style_changed()
+        return relayout
+
+    def _style_changed(self):
+        """Called by stylize after it changed style attributes of this
+        view that do not affect its layout."""
+        self.set_needs_display()
 
     def draw(self):
-        """Do not call directly."""
+        """Do not call directly.
+
+        Redraws the parts of the view that were invalidated since the
+        last draw and returns True if anything was redrawn. When True,
+        the surface is clipped to the redrawn area so that subclasses
+        may draw on top of the children; `drawn_rects` lists the local
+        rects that were redrawn.
+        """
+
+        if self.hidden or not self._dirty:
+            return False
 
-        if self.hidden:
+        if self._layout_stale():
+            self.layout()
+
+        bounds = pygame.Rect((0, 0), self.frame.size)
+
+        if self._needs_display:
+            damage = [bounds]
+        else:
+            damage = self._damage
+
+        for child in self.children:
+            if not child._dirty:
+                continue
+            redrawn = child.draw()
+            child._dirty = False
+            if redrawn:
+                child._drop_layer()
+                child._clean_composites = 0
+            old_rect = child._composited_rect
+            new_rect = None if child.hidden else child._extent()
+            if new_rect != old_rect:
+                damage.extend(r for r in (old_rect, new_rect) if r)
+            elif redrawn:
+                damage.extend(r.move(child.frame.topleft)
+                              for r in child.drawn_rects)
+            child._composited_rect = new_rect
+
+        self._dirty = False
+        self._needs_display = False
+        self._damage = []
+
+        damage = _coalesce(r.clip(bounds) for r in damage)
+        damage = [r for r in damage if r.w > 0 and r.h > 0]
+        if len(damage) > 1 and type(self).draw is not View.draw:
+            # Subclasses draw on top once; give them a single clip.
+            damage = [damage[0].unionall(damage[1:])]
+        self.drawn_rects = damage
+
+        if not damage:
             return False
 
+        for rect in damage:
+            self.surface.set_clip(rect)
+            self._draw_background_and_children(rect)
+
+        self.surface.set_clip(damage[0].unionall(damage[1:]))
+        return True
+
+    def _draw_background_and_children(self, rect):
         if self.background_color is not None:
             render.fillrect(self.surface, self.background_color,
                             rect=pygame.Rect((0, 0), self.frame.size))
+        else:
+            self.surface.fill((0, 0, 0, 0), rect)
 
         for child in self.children:
-            if not child.hidden:
-                child.draw()
-
-                topleft = child.frame.topleft
-
-                if child.shadowed:
-                    shadow_size = self.theme.shadow_size
-                    shadow_topleft = (topleft[0] - shadow_size // 2,
-                                      topleft[1] - shadow_size // 2)
-                    self.surface.blit(child.shadow_image, shadow_topleft)
-
-                self.surface.blit(child.surface, topleft)
-
-                if child.border_color and child.border_widths is not None:
-                    if type(child.border_widths) is int and child.border_widths > 0:
-                        pygame.draw.rect(self.surface, child.border_color,
-                                         child.frame, child.border_widths)
-                    else:
-                        tw, lw, bw, rw = child.get_border_widths()
-
-                        tl = (child.frame.left, child.frame.top)
-                        tr = (child.frame.right - 1, child.frame.top)
-                        bl = (child.frame.left, child.frame.bottom - 1)
-                        br = (child.frame.right - 1, child.frame.bottom - 1)
-
-                        if tw > 0:
-                            pygame.draw.line(self.surface, child.border_color,
-                                             tl, tr, tw)
-                        if lw > 0:
-                            pygame.draw.line(self.surface, child.border_color,
-                                             tl, bl, lw)
-                        if bw > 0:
-                            pygame.draw.line(self.surface, child.border_color,
-                                             bl, br, bw)
-                        if rw > 0:
-                            pygame.draw.line(self.surface, child.border_color,
-                                             tr, br, rw)
-        return True
+            if not child.hidden and child._extent().colliderect(rect):
+                child._composite(self.surface)
+
+    def _composite(self, dest):
+        """Draw the view with its shadow and border onto `dest`, the
+        surface of its parent."""
+        if self._wants_layer():
+            extent = self._extent()
+            if self._layer is None or self._layer.get_size() != extent.size:
+                self._drop_layer()
+                self._layer = surface_pool.acquire(extent.size)
+                self._layer.fill((0, 0, 0, 0))
+                self._draw_decorated(self._layer,
+                                     self.frame.move(-extent.x, -extent.y))
+            dest.blit(self._layer, extent.topleft)
+        else:
+            self._drop_layer()
+            self._draw_decorated(dest, self.frame)
+        self._clean_composites += 1
+
+    def _drop_layer(self):
+        if self._layer is not None:
+            surface_pool.release(self._layer)
+            self._layer = None
+
+    def _wants_layer(self):
+        if self.cache_layer is not None:
+            return self.cache_layer
+        if not self.children or self._clean_composites < layer_after:
+            return False
+        if self.shadowed:
+            # Translucent content blends differently over a pre-composited
+            # shadow, so only cache shadowed views with opaque backgrounds.
+            color = self.background_color
+            return (color is not None and
+                    (len(color) == 2 or len(color) == 3 or color[3] == 255))
+        return bool(self.border_color and self.border_widths)
+
+    def _draw_decorated(self, dest, frame):
+        topleft = frame.topleft
+
+        if self.shadowed:
+            shadow_size = self.theme.shadow_size
+            shadow_topleft = (topleft[0] - shadow_size // 2,
+                              topleft[1] - shadow_size // 2)
+            dest.blit(self.shadow_image, shadow_topleft)
+
+        dest.blit(self.surface, topleft)
+
+        if self.border_color and self.border_widths is not None:
+            if type(self.border_widths) is int and self.border_widths > 0:
+                pygame.draw.rect(dest, self.border_color,
+                                 frame, self.border_widths)
+            else:
+                tw, lw, bw, rw = self.get_border_widths()
+
+                tl = (frame.left, frame.top)
+                tr = (frame.right - 1, frame.top)
+                bl = (frame.left, frame.bottom - 1)
+                br = (frame.right - 1, frame.bottom - 1)
+
+                if tw > 0:
+                    pygame.draw.line(dest, self.border_color, tl, tr, tw)
+                if lw > 0:
+                    pygame.draw.line(dest, self.border_color, tl, bl, lw)
+                if bw > 0:
+                    pygame.draw.line(dest, self.border_color, bl, br, bw)
+                if rw > 0:
+                    pygame.draw.line(dest, self.border_color, tr, br, rw)
 
     def get_border_widths(self):
         """Return border width for each side top, left, bottom, right."""
@@ -302,6 +709,22 @@ class View(object):
             return [self.border_widths] * 4
         return self.border_widths
 
+    def set_hit_grid(self, cell_size=64):
+        """Index the children in a uniform grid to speed up `hit`.
+
+        Worth it for views with many (hundreds or more) children, e.g.
+        tiles or map markers. Pass None to drop the index. The index is
+        kept current as children are added, removed, moved and restacked
+        with bring_to_front / move_to_back; do not reorder `children`
+        directly while it is in use.
+        """
+        if cell_size is None:
+            self._hit_grid = None
+            return
+        self._hit_grid = spatial.GridIndex(cell_size)
+        for child in self.children:
+            self._hit_grid.add(child)
+
     def hit(self, pt):
         """Find the view (self, child, or None) under the point `pt`."""
 
@@ -314,7 +737,12 @@ class View(object):
         local_pt = (pt[0] - self.frame.topleft[0],
                     pt[1] - self.frame.topleft[1])
 
-        for child in reversed(self.children):   # front to back
+        if self._hit_grid is not None:
+            children = self._hit_grid.views_at(local_pt)
+        else:
+            children = reversed(self.children)
+
+        for child in children:   # front to back
             hit_view = child.hit(local_pt)
             if hit_view is not None:
                 return hit_view
@@ -331,6 +759,9 @@ class View(object):
         self.rm_child(child)
         self.children.append(child)
         child.parent = self
+        if self._hit_grid is not None:
+            self._hit_grid.add(child)
+        child._invalidate()
         child.parented()
         if current is not None:
             child.stylize()
@@ -340,6 +771,10 @@ class View(object):
             if ch == child:
                 ch.orphaned()
                 del self.children[index]
+                if self._hit_grid is not None:
+                    self._hit_grid.remove(ch)
+                self._invalidate_rect(ch._composited_rect)
+                ch._composited_rect = None
                 break
 
     def rm(self):
@@ -368,9 +803,17 @@ class View(object):
             ch = self.parent.children
             index = ch.index(self)
             ch[-1], ch[index] = ch[index], ch[-1]
+            if self.parent._hit_grid is not None:
+                self.parent._hit_grid.swap(ch[-1], ch[index])
+            self.parent._invalidate_rect(ch[index]._composited_rect)
+            self.parent._invalidate_rect(self._composited_rect)
 
     def move_to_back(self):
         if self.parent is not None:
             ch = self.parent.children
             index = ch.index(self)
             ch[0], ch[index] = ch[index], ch[0]
+            if self.parent._hit_grid is not None:
+                self.parent._hit_grid.swap(ch[0], ch[index])
+            self.parent._invalidate_rect(ch[index]._composited_rect)
+            self.parent._invalidate_rect(self._composited_rect)
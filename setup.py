@@ -19,13 +19,15 @@ package_version = re.search(
 # - package_data is what to install. MANIFEST.in is what to bundle.
 #   The distribute documentation says it can determine what data files to
 #   include without the need of MANIFEST.in but I had no luck with that.
-# - We find the bundled resource files at runtime using the pkg_resources
-#   module from setuptools. Thus, setuptools is also a dependency.
+# - We find the bundled resource files at runtime using importlib.resources,
+#   or on Pythons older than 3.9 the pkg_resources module from setuptools.
+#   Thus, setuptools is also a dependency.
 
 # Dependencies
 # - While Pygame is listed as a dependency, you should install it separately to
 #   avoid issues with libpng and others.
 #   See: http://www.pygame.org/install.html
+# - NumPy is optional; when installed, per-pixel rendering uses surfarray.
 
 setup(
     name='pygameui',
@@ -33,9 +35,10 @@ setup(
     author='Brian Hammond',
     author_email='brian@fictorial.com',
     install_requires=['setuptools', 'pygame>=1.9.1'],
+    extras_require={'numpy': ['numpy']},
     packages=['pygameui'],
     package_data={'pygameui': ['resources/*/*']},
-    scripts=['bin/pygameui-kitchensink.py'],
+    scripts=['bin/pygameui-kitchensink.py', 'bin/pygameui-benchmark.py'],
     description='GUI framework for Pygame',
     keywords="UI GUI Pygame button scrollbar progress slider user interface",
     license='MIT',